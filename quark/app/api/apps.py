@@ -1,14 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlmodel import Session, select
-from typing import List, Optional
-from app.database import get_session
-from app.models.application import Application
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import delete, tuple_, update
+from typing import AsyncIterator, Callable, Optional, Tuple
+from datetime import datetime
+from app.database import get_async_session
+from app.models.application import Application, AppStatus
 from app.schemas.application import ApplicationCreate, ApplicationResponse, ApplicationUpdate
 from app.utils.auth import get_current_user
 from app.models.user import User
-from app.services.resource import ResourceManager
 from app.services.apps import ApplicationService
+from app.config import settings
+from app.utils.cache import application_namespace, cache_get_raw, cache_set_raw, cache_clear
+import base64
+import binascii
+import json
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
 
@@ -22,10 +31,99 @@ router = APIRouter(
     }
 )
 
+# Plain columns backing the list response. Selecting them instead of the
+# entity means no ORM objects are built and nothing can be lazy-loaded per row.
+_LIST_COLUMNS = (
+    Application.id,
+    Application.name,
+    Application.repo_url,
+    Application.branch,
+    Application.cpu_limit,
+    Application.memory_limit,
+    Application.auto_deploy,
+    Application.env_vars,
+    Application.owner_id,
+    Application.status,
+    Application.created_at,
+    Application.updated_at,
+    Application.deployment_url
+)
+
+def _build_packer(fields) -> Callable[[Application], dict]:
+    """Generate a function copying the given attributes into a dict"""
+    items = ", ".join(f"{name!r}: a.{name}" for name in fields)
+    namespace: dict = {}
+    exec(compile(f"def pack(a):\n    return {{{items}}}\n", "<pack_application>", "exec"), namespace)
+    return namespace["pack"]
+
+# With FAST_SERIALIZE, single-application responses skip pydantic and are
+# built by a generated packer; any schema/model drift falls back to model_validate
+_pack_application = None
+if settings.FAST_SERIALIZE:
+    _missing = set(ApplicationResponse.model_fields) - set(Application.model_fields)
+    if _missing:
+        logger.warning("FAST_SERIALIZE disabled, model lacks response fields: %s", sorted(_missing))
+    else:
+        _pack_application = _build_packer(ApplicationResponse.model_fields)
+
+def _application_response(application: Application):
+    """Build the response for a single application"""
+    if _pack_application is not None:
+        return ORJSONResponse(_pack_application(application))
+    return ApplicationResponse.model_validate(application)
+
+async def _stream_page(db: AsyncSession, query, limit: int, cache_key: str) -> AsyncIterator[bytes]:
+    """Yield a page of applications as JSON, one row at a time"""
+    # Serialized chunks are kept so the whole body can be cached at the end
+    chunks = [b'{"items":[']
+    yield chunks[0]
+    
+    count = 0
+    last = None
+    # The session dependency has already exited by the time the body is sent,
+    # so the connection checked out here has to be returned by this generator
+    try:
+        result = await db.stream(query)
+        async for row in result.mappings():
+            last = row
+            chunk = orjson.dumps(dict(row))
+            if count:
+                chunk = b"," + chunk
+            count += 1
+            chunks.append(chunk)
+            yield chunk
+    finally:
+        await db.close()
+    
+    next_cursor = None
+    if count == limit:
+        next_cursor = _encode_cursor(last["created_at"], last["id"])
+    chunk = b'],"next_cursor":' + orjson.dumps(next_cursor) + b"}"
+    chunks.append(chunk)
+    yield chunk
+    
+    await cache_set_raw(cache_key, b"".join(chunks))
+
+def _encode_cursor(created_at: datetime, app_id: int) -> str:
+    """Encode the (created_at, id) position of the last row of a page"""
+    payload = json.dumps([created_at.isoformat(), app_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by _encode_cursor"""
+    try:
+        created_at, app_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(app_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
 @router.post("/", response_model=ApplicationResponse)
 async def create_application(
     app_data: ApplicationCreate,
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -172,7 +270,8 @@ async def create_application(
     - Auto-deploy requires webhook configuration
     - Build settings are validated before creation
     """
-    logger.info(f"Creating application with data: {app_data.dict()}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Creating application with data: %s", app_data.model_dump_json())
     app_service = ApplicationService(db)
     
     try:
@@ -181,29 +280,16 @@ async def create_application(
             app_data=app_data,
             owner_id=current_user.id
         )
-        logger.info(f"Application created successfully: {application}")
-        
-        # Convert to response model
-        response = ApplicationResponse(
-            id=application.id,
-            name=application.name,
-            repo_url=application.repo_url,
-            branch=application.branch,
-            cpu_limit=application.cpu_limit,
-            memory_limit=application.memory_limit,
-            auto_deploy=application.auto_deploy,
-            env_vars=application.env_vars,
-            owner_id=application.owner_id,
-            status=application.status,
-            created_at=application.created_at,
-            updated_at=application.updated_at,
-            deployment_url=application.deployment_url
+        logger.info(
+            "Application created: id=%s owner_id=%s name=%s",
+            application.id, current_user.id, application.name
         )
-        logger.info(f"Response model created: {response.dict()}")
-        return response
+        await cache_clear(application_namespace(current_user.id))
+        
+        return _application_response(application)
         
     except Exception as e:
-        logger.error(f"Failed to create application: {str(e)}", exc_info=True)
+        logger.error("Failed to create application: %s", e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
@@ -211,10 +297,10 @@ async def create_application(
 
 @router.get("/", response_model=None)
 async def list_applications(
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     limit: int = Query(10, ge=1, le=100),
-    status: Optional[str] = Query(None),
-    db: Session = Depends(get_session),
+    status: Optional[AppStatus] = Query(None),
+    db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -222,18 +308,17 @@ async def list_applications(
 
     Optional Query Parameters:
     -----------------------
-    - **offset**: int (default: 0)
-        * Number of records to skip
-        * Used for pagination
-        * Must be >= 0
-        * Example: 0, 10, 20
+    - **cursor**: str (optional)
+        * Opaque pagination cursor
+        * Pass the `next_cursor` value from the previous page
+        * Omit to fetch the first page
 
     - **limit**: int (default: 10)
         * Maximum number of records to return
         * Range: 1-100
         * Example: 10, 25, 50
 
-    - **status**: str (optional)
+    - **status**: AppStatus (optional)
         * Filter applications by status
         * Valid values:
             - "created": Initial setup
@@ -246,24 +331,27 @@ async def list_applications(
     Returns:
     --------
     ```json
-    [
-        {
-            "id": 123,
-            "name": "app-1",
-            "status": "running",
-            "repo_url": "https://github.com/username/app-1",
-            "created_at": "2024-03-07T12:00:00Z",
-            "last_deployment": "2024-03-07T12:00:00Z"
-        },
-        {
-            "id": 124,
-            "name": "app-2",
-            "status": "failed",
-            "repo_url": "https://github.com/username/app-2",
-            "created_at": "2024-03-07T13:00:00Z",
-            "last_deployment": "2024-03-07T13:00:00Z"
-        }
-    ]
+    {
+        "items": [
+            {
+                "id": 124,
+                "name": "app-2",
+                "status": "failed",
+                "repo_url": "https://github.com/username/app-2",
+                "created_at": "2024-03-07T13:00:00Z",
+                "last_deployment": "2024-03-07T13:00:00Z"
+            },
+            {
+                "id": 123,
+                "name": "app-1",
+                "status": "running",
+                "repo_url": "https://github.com/username/app-1",
+                "created_at": "2024-03-07T12:00:00Z",
+                "last_deployment": "2024-03-07T12:00:00Z"
+            }
+        ],
+        "next_cursor": "WyIyMDI0LTAzLTA3VDEyOjAwOjAwIiwgMTIzXQ=="
+    }
     ```
 
     Notes:
@@ -272,56 +360,55 @@ async def list_applications(
     - Only returns applications owned by the authenticated user
     - Includes basic metrics and last deployment status
     - Pagination is required for large result sets
+    - `next_cursor` is null on the last page
 
     Error Responses:
     --------------
     - **400 Bad Request**
-        * Invalid offset/limit values
-        * Invalid status filter
+        * Invalid cursor
     
     - **401 Unauthorized**
         * Authentication required
+    
+    - **422 Unprocessable Entity**
+        * Invalid limit value or status filter
     """
-    # Build the query
-    query = select(Application).where(Application.owner_id == current_user.id)
+    status_filter = status.value if status else None
+    cache_key = f"{application_namespace(current_user.id)}:list:{status_filter}:{cursor}:{limit}"
+    cached = await cache_get_raw(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
     
-    # Apply status filter if provided
-    if status:
-        query = query.where(Application.status == status)
+    # Build the query, selecting only the columns in the response
+    query = select(*_LIST_COLUMNS).where(Application.owner_id == current_user.id)
     
-    # Apply pagination and ordering
-    query = query.order_by(Application.created_at.desc()).offset(offset).limit(limit)
+    # Apply status filter if provided
+    if status_filter:
+        query = query.where(Application.status == status_filter)
     
-    # Execute the query
-    applications = db.exec(query).all()
+    # Resume after the last row of the previous page
+    if cursor:
+        cursor_created_at, cursor_id = _decode_cursor(cursor)
+        query = query.where(
+            tuple_(Application.created_at, Application.id) < (cursor_created_at, cursor_id)
+        )
     
-    # Manually create response dictionaries with required fields
-    result = []
-    for app in applications:
-        # Create a dictionary with all fields from the application
-        app_data = {
-            "id": app.id,
-            "name": app.name,
-            "repo_url": app.repo_url,
-            "branch": app.branch,
-            "cpu_limit": app.cpu_limit,
-            "memory_limit": app.memory_limit,
-            "auto_deploy": app.auto_deploy,
-            "env_vars": app.env_vars,
-            "owner_id": app.owner_id,
-            "status": "created",  # Always set a default status
-            "created_at": app.created_at,
-            "updated_at": app.updated_at,
-            "deployment_url": None if not hasattr(app, "deployment_url") else app.deployment_url
-        }
-        result.append(app_data)  # Return plain dictionaries instead of model objects
+    # Apply pagination and ordering
+    query = query.order_by(
+        Application.created_at.desc(),
+        Application.id.desc()
+    ).limit(limit)
     
-    return result
+    # Stream rows straight from a server-side cursor instead of building the list
+    return StreamingResponse(
+        _stream_page(db, query, limit, cache_key),
+        media_type="application/json"
+    )
 
 @router.get("/{app_id}", response_model=ApplicationResponse)
 async def get_application(
     app_id: int,
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -372,55 +459,55 @@ async def get_application(
         * Invalid token
         * Token expired
     
-    - **403 Forbidden**
-        * Insufficient permissions
-        * Application belongs to another user
-    
     - **404 Not Found**
         * Application ID does not exist
+        * Application belongs to another user
     """
-    application = db.get(Application, app_id)
+    cache_key = f"{application_namespace(current_user.id)}:{app_id}"
+    cached = await cache_get_raw(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
+    # Filter by owner in SQL so other users' apps are indistinguishable from missing ones
+    application = (await db.exec(
+        select(Application)
+        .where(Application.id == app_id)
+        .where(Application.owner_id == current_user.id)
+    )).first()
     if not application:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Application not found"
         )
     
-    if application.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access this application"
-        )
-    
-    # Ensure status field is set
-    app_dict = application.dict()
-    if not app_dict.get('status'):
-        app_dict['status'] = "created"
-    
-    return ApplicationResponse(**app_dict)
+    if _pack_application is not None:
+        body = orjson.dumps(_pack_application(application))
+    else:
+        body = ApplicationResponse.model_validate(application).model_dump_json().encode()
+    await cache_set_raw(cache_key, body)
+    return Response(content=body, media_type="application/json")
 
 @router.delete("/{app_id}")
 async def delete_application(
     app_id: int,
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Delete an application"""
-    application = db.get(Application, app_id)
-    if not application:
+    result = await db.exec(
+        delete(Application)
+        .where(Application.id == app_id)
+        .where(Application.owner_id == current_user.id)
+    )
+    await db.commit()
+    
+    if result.rowcount == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Application not found"
         )
     
-    if application.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to delete this application"
-        )
-    
-    db.delete(application)
-    db.commit()
+    await cache_clear(application_namespace(current_user.id))
     
     return {"status": "success", "message": "Application deleted"}
 
@@ -428,7 +515,7 @@ async def delete_application(
 async def update_application(
     app_id: int,
     app_data: ApplicationUpdate,
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -503,35 +590,33 @@ async def update_application(
     - **401 Unauthorized**
         * Authentication required
     
-    - **403 Forbidden**
-        * Insufficient permissions
-    
     - **404 Not Found**
         * Application not found
+        * Application belongs to another user
     
     - **409 Conflict**
         * Name already in use
         * Update conflicts with running deployment
     """
-    application = db.get(Application, app_id)
+    values = app_data.model_dump(exclude_unset=True, mode="json")
+    if not values:
+        return await get_application(app_id=app_id, db=db, current_user=current_user)
+    
+    # Single UPDATE ... RETURNING instead of select, mutate, commit, refresh
+    application = (await db.exec(
+        update(Application)
+        .where(Application.id == app_id)
+        .where(Application.owner_id == current_user.id)
+        .values(**values)
+        .returning(Application)
+    )).scalar_one_or_none()
     if not application:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Application not found"
         )
     
-    if application.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update this application"
-        )
-    
-    # Update application fields
-    for field, value in app_data.dict(exclude_unset=True).items():
-        setattr(application, field, value)
-    
-    db.add(application)
-    db.commit()
-    db.refresh(application)
+    await db.commit()
+    await cache_clear(application_namespace(current_user.id))
     
-    return application 
\ No newline at end of file
+    return _application_response(application) 
\ No newline at end of file
@@ -1,17 +1,26 @@
 from datetime import timedelta
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlalchemy.exc import IntegrityError
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse, Token
 from app.utils.auth import (
     get_password_hash,
     verify_password,
+    password_needs_rehash,
     create_access_token,
-    get_current_user
+    get_current_user,
+    invalidate_user,
+    oauth2_scheme,
+    revoke_token,
+    hash_executor,
+    DUMMY_PASSWORD_HASH
 )
-from app.database import get_session
-from app.config import settings
+from app.database import get_async_session
+from app.config import Settings, get_settings
 
 router = APIRouter(
     prefix="/auth",
@@ -26,7 +35,7 @@ router = APIRouter(
 @router.post("/register", response_model=UserResponse)
 async def register_user(
     user_data: UserCreate,
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
     """
     Register a new user in the QUARK platform.
@@ -63,28 +72,10 @@ async def register_user(
     - **400**: Username already taken or email already registered
     - **422**: Invalid input data format
     """
-    # Check if user exists
-    existing_user = db.exec(
-        select(User).where(
-            (User.email == user_data.email) | 
-            (User.username == user_data.username)
-        )
-    ).first()
-    
-    if existing_user:
-        if existing_user.email == user_data.email:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already taken"
-            )
-    
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    # Create new user; the unique indexes on email/username reject duplicates
+    hashed_password = await asyncio.get_running_loop().run_in_executor(
+        hash_executor, get_password_hash, user_data.password
+    )
     user = User(
         username=user_data.username,
         email=user_data.email,
@@ -92,15 +83,36 @@ async def register_user(
     )
     
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        # Only pay for the lookup when the insert conflicted
+        existing_user = (await db.exec(
+            select(User.email, User.username).where(
+                (User.email == user_data.email) | 
+                (User.username == user_data.username)
+            ).limit(1)
+        )).first()
+        
+        if existing_user and existing_user.username == user_data.username \
+                and existing_user.email != user_data.email:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Username already taken"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     
     return user
 
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session),
+    settings: Settings = Depends(get_settings)
 ):
     """
     Authenticate user and return JWT token.
@@ -126,20 +138,38 @@ async def login(
     - **429**: Too many login attempts
     """
     # Try to find user by username or email
-    user = db.exec(
+    user = (await db.exec(
         select(User).where(
             (User.email == form_data.username) | 
             (User.username == form_data.username)
-        )
-    ).first()
+        ).limit(1)
+    )).first()
     
-    if not user or not verify_password(form_data.password, user.password):
+    # Always verify against some hash so unknown users take as long as known ones
+    loop = asyncio.get_running_loop()
+    password_valid = await loop.run_in_executor(
+        hash_executor,
+        verify_password,
+        form_data.password,
+        user.password if user else DUMMY_PASSWORD_HASH
+    )
+    
+    if not user or not password_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username/email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Upgrade legacy bcrypt hashes now that we know the plain password
+    if password_needs_rehash(user.password):
+        user.password = await loop.run_in_executor(
+            hash_executor, get_password_hash, form_data.password
+        )
+        db.add(user)
+        await db.commit()
+        invalidate_user(user.email)
+    
     access_token = create_access_token(
         data={"sub": user.email},
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -152,4 +182,13 @@ async def read_users_me(
     current_user: User = Depends(get_current_user)
 ):
     """Get current user information"""
-    return current_user 
\ No newline at end of file
+    return current_user
+
+@router.post("/logout")
+async def logout(
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_user)
+):
+    """Revoke the current access token"""
+    revoke_token(token)
+    return {"detail": "Logged out"}
@@ -1,13 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Query
-from sqlmodel import Session, select
+from fastapi.responses import ORJSONResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List, Optional
-from app.database import get_session
+from app.database import get_async_session
 from app.models.deployment import Deployment
 from app.schemas.deployment import DeploymentCreate, DeploymentResponse, DeploymentStatus
-from app.services.deployment import DeploymentService
+from app.services.deployment import DeploymentService, run_deployment
 from app.utils.auth import get_current_user
+from app.utils.http_cache import ConditionalGet
 from app.models.user import User
 
+# Columns backing DeploymentResponse, so list pages skip building ORM objects
+_RESPONSE_COLUMNS = tuple(getattr(Deployment, name) for name in DeploymentResponse.model_fields)
+
+def _deployment_body(deployment: Deployment) -> dict:
+    """Response fields of a deployment we loaded ourselves, without re-validating them"""
+    return {name: getattr(deployment, name) for name in DeploymentResponse.model_fields}
+
 router = APIRouter(
     prefix="/deployments",
     tags=["Deployments"],
@@ -22,7 +32,7 @@ router = APIRouter(
 async def create_deployment(
     deployment: DeploymentCreate,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -116,7 +126,7 @@ async def create_deployment(
     ```json
     {
         "id": 1,
-        "status": "in_progress",
+        "status": "pending",
         "application_id": 1,
         "version": "v1.0.0",
         "environment": "production",
@@ -176,15 +186,16 @@ async def create_deployment(
         deployment.commit_sha
     )
     
-    # Trigger the deployment process
-    deployment_record = await service.trigger_deployment(deployment_record.id)
+    # Build and roll out after the response is sent
+    background_tasks.add_task(run_deployment, deployment_record.id)
     
-    return deployment_record
+    return ORJSONResponse(_deployment_body(deployment_record))
 
 @router.get("/{deployment_id}", response_model=DeploymentResponse)
 async def get_deployment(
     deployment_id: int,
-    db: Session = Depends(get_session),
+    cache: ConditionalGet = Depends(),
+    db: AsyncSession = Depends(get_async_session),
     current_user = Depends(get_current_user)
 ):
     """
@@ -256,13 +267,21 @@ async def get_deployment(
     - **403**: Not authorized to view this deployment
     - **404**: Deployment not found
     """
-    deployment = db.get(Deployment, deployment_id)
+    # Load the response columns as a plain mapping; no ORM object means
+    # nothing can lazy-load during serialization
+    deployment = (await db.exec(
+        select(*_RESPONSE_COLUMNS).where(Deployment.id == deployment_id)
+    )).mappings().first()
     if not deployment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Deployment not found"
         )
-    return deployment
+    
+    not_modified = cache.check(deployment["updated_at"].timestamp())
+    if not_modified is not None:
+        return not_modified
+    return ORJSONResponse(dict(deployment), headers=cache.headers)
 
 @router.get("/application/{app_id}", response_model=List[DeploymentResponse])
 async def list_application_deployments(
@@ -270,7 +289,7 @@ async def list_application_deployments(
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
     status: Optional[str] = Query(None, description="Filter by deployment status"),
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_async_session),
     current_user = Depends(get_current_user)
 ):
     """
@@ -324,7 +343,7 @@ async def list_application_deployments(
     - **403**: Not authorized to view this application
     - **404**: Application not found
     """
-    query = select(Deployment).where(Deployment.application_id == app_id)
+    query = select(*_RESPONSE_COLUMNS).where(Deployment.application_id == app_id)
     
     if status:
         query = query.where(Deployment.status == status)
@@ -332,5 +351,5 @@ async def list_application_deployments(
     query = query.order_by(Deployment.created_at.desc())
     query = query.offset(offset).limit(limit)
     
-    deployments = db.exec(query).all()
-    return deployments 
\ No newline at end of file
+    # Rows come straight from the database, so skip re-validating them
+    return ORJSONResponse([dict(row) for row in (await db.exec(query)).mappings()]) 
\ No newline at end of file
@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Depends, Header, HTTPException, Request
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from collections import OrderedDict
 import hmac
-import hashlib
+import orjson
 from app.config import settings
-from app.database import get_session
+from app.database import get_async_session
 from app.models.application import Application
-from app.services.deployment import DeploymentService
+from app.services.deployment import DeploymentService, deployment_batcher
+from app.utils.cache import cache_add, cache_delete
 import logging
 from app.utils.auth import get_current_user
 from app.services.github import GitHubService
@@ -23,31 +26,66 @@ router = APIRouter(
     }
 )
 
+# Keyed once at import; each delivery feeds a copy
+_WEBHOOK_MAC = (
+    hmac.new(settings.GITHUB_WEBHOOK_SECRET.encode(), digestmod="sha256")
+    if settings.GITHUB_WEBHOOK_SECRET else None
+)
+_DIGEST_PREFIX = "sha256="
+
 async def verify_github_signature(
     request: Request,
     x_hub_signature: str = Header(..., alias="X-Hub-Signature-256")
-) -> bool:
-    """Verify GitHub webhook signature"""
-    if not settings.GITHUB_WEBHOOK_SECRET:
-        return True
-        
-    body = await request.body()
-    hmac_gen = hmac.new(
-        settings.GITHUB_WEBHOOK_SECRET.encode(),
-        msg=body,
-        digestmod=hashlib.sha256
-    )
-    digest = f"sha256={hmac_gen.hexdigest()}"
+) -> bytes:
+    """Verify GitHub webhook signature and return the raw body"""
+    # Feed the HMAC chunk by chunk as the body arrives
+    mac = _WEBHOOK_MAC.copy() if _WEBHOOK_MAC is not None else None
+    chunks = []
+    async for chunk in request.stream():
+        if mac is not None:
+            mac.update(chunk)
+        chunks.append(chunk)
     
-    if not hmac.compare_digest(digest, x_hub_signature):
+    if mac is not None and not _signature_matches(mac.digest(), x_hub_signature):
         raise HTTPException(status_code=401, detail="Invalid signature")
-    return True
+    return b"".join(chunks)
+
+def _signature_matches(digest: bytes, signature: str) -> bool:
+    """Compare raw digest bytes with a "sha256=<hex>" header, skipping hex encoding"""
+    if not signature.startswith(_DIGEST_PREFIX):
+        return False
+    try:
+        expected = bytes.fromhex(signature[len(_DIGEST_PREFIX):])
+    except ValueError:
+        return False
+    return hmac.compare_digest(digest, expected)
+
+# Recently processed delivery IDs, oldest first
+_seen_deliveries: "OrderedDict[str, None]" = OrderedDict()
+_MAX_DELIVERIES = 10_000
+_DELIVERY_TTL_SECONDS = 3600
+
+async def _claim_delivery(delivery: str) -> bool:
+    """Record a delivery ID, returning False if it was already seen"""
+    if delivery in _seen_deliveries:
+        return False
+    _seen_deliveries[delivery] = None
+    if len(_seen_deliveries) > _MAX_DELIVERIES:
+        _seen_deliveries.popitem(last=False)
+    # Redis, when configured, shares the check across workers
+    return await cache_add(f"github:delivery:{delivery}", expire=_DELIVERY_TTL_SECONDS)
+
+async def _release_delivery(delivery: str) -> None:
+    """Forget a delivery ID so a retry is processed"""
+    _seen_deliveries.pop(delivery, None)
+    await cache_delete(f"github:delivery:{delivery}")
 
 @router.post("/webhook")
 async def github_webhook(
     request: Request,
     x_hub_signature: str = Header(..., alias="X-Hub-Signature-256"),
-    db: Session = Depends(get_session)
+    body: bytes = Depends(verify_github_signature),
+    db: AsyncSession = Depends(get_async_session)
 ):
     """
     Handle GitHub webhook events for automated deployments.
@@ -130,47 +168,62 @@ async def github_webhook(
     - Triggers async deployment process
     - Supports GitHub deployment API
     """
-    payload = await request.json()
-    
     # Only process push events
     if request.headers.get("X-GitHub-Event") != "push":
         return {"status": "ignored", "event": "non-push"}
-        
+    
+    # GitHub retries reuse the delivery ID; only the first one deploys
+    delivery = request.headers.get("X-GitHub-Delivery")
+    if delivery and not await _claim_delivery(delivery):
+        return {"status": "duplicate", "delivery": delivery}
+    
     try:
+        return await _process_push(body, db)
+    except Exception:
+        # Let GitHub's retry of a failed delivery through
+        if delivery:
+            await _release_delivery(delivery)
+        raise
+
+async def _process_push(body: bytes, db: AsyncSession) -> dict:
+    """Create and start a deployment for a push to a tracked branch"""
+    try:
+        payload = orjson.loads(body)
         # Extract repository and branch information
         repo_url = payload["repository"]["clone_url"]
         branch = payload["ref"].split("/")[-1]
         commit_sha = payload["after"]
-        
-        # Find matching application
-        application = db.exec(
-            select(Application)
-            .where(Application.repo_url == repo_url)
-            .where(Application.branch == branch)
-        ).first()
-        
-        if not application:
-            return {"status": "ignored", "reason": "no matching application"}
-            
-        # Trigger deployment
-        deployment_service = DeploymentService(db)
+    except (orjson.JSONDecodeError, KeyError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
+    
+    # Find matching application
+    application_id = (await db.exec(
+        select(Application.id)
+        .where(Application.repo_url == repo_url)
+        .where(Application.branch == branch)
+        .limit(1)
+    )).first()
+    
+    if application_id is None:
+        return {"status": "ignored", "reason": "no matching application"}
+    
+    # Trigger deployment
+    deployment_service = DeploymentService(db)
+    try:
         deployment = await deployment_service.create_deployment(
-            application.id,
+            application_id,
             commit_sha
         )
-        
-        # Start deployment process
-        await deployment_service.trigger_deployment(deployment.id)
-        
-        return {
-            "status": "accepted",
-            "deployment_id": deployment.id,
-            "message": "Deployment triggered"
-        }
-        
-    except Exception as e:
-        logger.error(f"Failed to process webhook: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to process webhook: {str(e)}"
-        ) 
\ No newline at end of file
+    except ValueError as e:
+        # The application was deleted after the lookup above
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    # Start deployment process in the background; bursts of pushes
+    # are marked as building in a single transaction
+    deployment_batcher.submit(deployment.id)
+    
+    return {
+        "status": "accepted",
+        "deployment_id": deployment.id,
+        "message": "Deployment triggered"
+    }
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.utils.auth import get_current_user
+from app.utils.http_cache import ConditionalGet, body_version
 from app.services.monitoring import MonitoringService
-from app.database import get_session
-from sqlmodel import Session
+from app.database import get_async_session, get_pool_status
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Dict, List, Optional
 from app.models.user import User
-from app.schemas.metrics import SystemMetrics, ApplicationMetrics, ContainerMetrics
+from app.schemas.metrics import SystemMetrics, AppLiveMetrics, ApplicationMetrics, ContainerMetrics
 from datetime import datetime, timedelta
+import re
 
 router = APIRouter(
     prefix="/metrics",
@@ -18,8 +21,30 @@ router = APIRouter(
     }
 )
 
+_INTERVAL_RE = re.compile(r"^(?P<n>[0-9]+)(?P<u>[mhd])$")
+_INTERVAL_UNITS = {"m": "minutes", "h": "hours", "d": "days"}
+_MIN_INTERVAL = timedelta(minutes=1)
+_MAX_INTERVAL = timedelta(days=7)
+
+def parse_interval(interval: str = Query("5m", description="Aggregation interval, e.g. 5m, 1h, 1d")) -> timedelta:
+    """Parse an interval such as "5m" into a timedelta"""
+    match = _INTERVAL_RE.match(interval)
+    if match is None:
+        raise HTTPException(status_code=400, detail="Invalid interval format")
+    
+    value = timedelta(**{_INTERVAL_UNITS[match["u"]]: int(match["n"])})
+    if not _MIN_INTERVAL <= value <= _MAX_INTERVAL:
+        raise HTTPException(status_code=400, detail="Interval must be between 1m and 7d")
+    return value
+
+@router.get("/prometheus", response_class=Response)
+async def get_prometheus_metrics(current_user: User = Depends(get_current_user)):
+    """Process-wide Prometheus metrics, including database pool usage"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @router.get("/system", response_model=SystemMetrics)
 async def get_system_metrics(
+    cache: ConditionalGet = Depends(),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -40,7 +65,14 @@ async def get_system_metrics(
         "cpu_percent": 45.2,
         "memory_percent": 62.8,
         "disk_percent": 73.1,
-        "timestamp": 1709812345
+        "timestamp": 1709812345,
+        "db_pool": {
+            "status": "Pool size: 20  Connections in pool: 1 ...",
+            "size": 20,
+            "checked_in": 1,
+            "checked_out": 0,
+            "overflow": -19
+        }
     }
     ```
 
@@ -55,12 +87,21 @@ async def get_system_metrics(
     - **500**: Error collecting metrics
     """
     monitoring_service = MonitoringService()
-    return await monitoring_service.get_system_metrics()
+    metrics = await monitoring_service.get_system_metrics()
+    # Pool usage shows connection saturation before requests start timing out
+    body = {**metrics, "db_pool": get_pool_status()}
+    
+    # Pool usage changes within a metrics timestamp, so the tag covers the whole body
+    not_modified = cache.check(body_version(body))
+    if not_modified is not None:
+        return not_modified
+    return body
 
-@router.get("/apps/{app_id}", response_model=ApplicationMetrics)
+@router.get("/apps/{app_id}", response_model=AppLiveMetrics)
 async def get_app_metrics(
     app_id: int,
-    db: Session = Depends(get_session),
+    cache: ConditionalGet = Depends(),
+    db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Get application-specific metrics"""
@@ -70,12 +111,15 @@ async def get_app_metrics(
     if "error" in metrics:
         raise HTTPException(status_code=404, detail=metrics["error"])
     
+    not_modified = cache.check(f"{app_id}-{metrics['timestamp']}")
+    if not_modified is not None:
+        return not_modified
     return metrics
 
 @router.get("/deployments/{deployment_id}", response_model=ContainerMetrics)
 async def get_deployment_metrics(
     deployment_id: int,
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Get deployment-specific metrics"""
@@ -88,7 +132,7 @@ async def get_app_metrics_history(
     start_time: datetime = Query(..., description="Start timestamp (ISO format)"),
     end_time: datetime = Query(..., description="End timestamp (ISO format)"),
     interval: int = Query(300, description="Interval in seconds (default: 5 minutes)"),
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -139,8 +183,8 @@ async def get_application_metrics(
     app_id: int,
     start_time: Optional[datetime] = Query(None),
     end_time: Optional[datetime] = Query(None),
-    interval: str = Query("5m", regex="^[0-9]+[mhd]$"),
-    db: Session = Depends(get_session),
+    interval: timedelta = Depends(parse_interval),
+    db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query
-from app.utils.auth import get_current_user, verify_token
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Query, status
+from sqlmodel import select
+from app.utils.auth import verify_token_cached
 from app.services.monitoring import MonitoringService
-import json
+from app.database import async_session_maker
+from app.models.application import Application
+from app.models.user import User
+import asyncio
 import logging
-from typing import Dict, List, Optional
+import orjson
+from typing import Dict, Set
 
 router = APIRouter(
     prefix="/ws",
@@ -17,32 +22,59 @@ logger = logging.getLogger(__name__)
 
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: Dict[int, List[WebSocket]] = {}
-
-    async def connect(self, websocket: WebSocket, user_id: int):
-        await websocket.accept()
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
-
-    async def disconnect(self, websocket: WebSocket, user_id: int):
-        if user_id in self.active_connections:
-            self.active_connections[user_id].remove(websocket)
-            if not self.active_connections[user_id]:
-                del self.active_connections[user_id]
-
-    async def send_personal_message(self, message: dict, user_id: int):
-        if user_id in self.active_connections:
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_json(message)
-                except WebSocketDisconnect:
-                    await self.disconnect(connection, user_id)
-                except Exception as e:
-                    logger.error(f"Failed to send message: {str(e)}")
+        # Per-application subscriber queues, fed by one producer task per application
+        self.topics: Dict[int, Set[asyncio.Queue]] = {}
+        self.producers: Dict[int, asyncio.Task] = {}
+
+    def subscribe(self, app_id: int) -> asyncio.Queue:
+        """Register a subscriber for an application's metrics"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=8)
+        self.topics.setdefault(app_id, set()).add(queue)
+        if app_id not in self.producers:
+            self.producers[app_id] = asyncio.create_task(self._produce(app_id))
+        return queue
+
+    def unsubscribe(self, app_id: int, queue: asyncio.Queue) -> None:
+        """Remove a subscriber, stopping the producer once nobody is listening"""
+        subscribers = self.topics.get(app_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self.topics[app_id]
+            producer = self.producers.pop(app_id, None)
+            if producer is not None:
+                producer.cancel()
+
+    async def _produce(self, app_id: int) -> None:
+        """Collect an application's metrics once per tick and publish them to every subscriber"""
+        service = MonitoringService()
+        while app_id in self.topics:
+            try:
+                async with async_session_maker() as db:
+                    service.db = db
+                    metrics = await service.get_app_metrics(app_id)
+            except Exception as e:
+                logger.exception("Failed to collect metrics for app %s", app_id)
+                metrics = {"error": str(e)}
+            
+            data = orjson.dumps({"type": "metrics", "data": metrics}).decode()
+            for queue in self.topics.get(app_id, ()):
+                # Slow subscribers lose their oldest update rather than stalling the rest
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(data)
+            
+            await asyncio.sleep(1)
 
 manager = ConnectionManager()
-monitoring_service = MonitoringService()
+
+async def _drain(websocket: WebSocket) -> None:
+    """Consume client frames until the peer disconnects"""
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
 
 @router.websocket("/metrics/{app_id}")
 async def metrics_websocket(
@@ -127,15 +159,38 @@ async def metrics_websocket(
     - **403**: Insufficient permissions
     - **404**: Application not found
     """
-    await manager.connect(websocket, current_user["id"])
+    try:
+        payload = await verify_token_cached(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    # Only the application's owner may watch its containers
+    async with async_session_maker() as db:
+        owned = (await db.exec(
+            select(Application.id)
+            .join(User, User.id == Application.owner_id)
+            .where(Application.id == app_id)
+            .where(User.email == payload.get("sub"))
+        )).first()
+    if owned is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    queue = manager.subscribe(app_id)
+    reader = asyncio.create_task(_drain(websocket))
     try:
         while True:
-            # Get metrics for the application
-            metrics = await monitoring_service.get_app_metrics(app_id)
-            await manager.send_personal_message(
-                {"type": "metrics", "data": metrics},
-                current_user["id"]
-            )
-            await websocket.receive_text()  # Keep connection alive
+            # Metrics arrive already encoded from the application's producer
+            update = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait({update, reader}, return_when=asyncio.FIRST_COMPLETED)
+            if update not in done:
+                update.cancel()
+                break
+            await websocket.send_text(update.result())
     except WebSocketDisconnect:
-        await manager.disconnect(websocket, current_user["id"]) 
\ No newline at end of file
+        pass
+    finally:
+        reader.cancel()
+        manager.unsubscribe(app_id, queue)
@@ -1,15 +1,27 @@
-from pydantic import BaseSettings
-from typing import Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import List, Optional
+from functools import lru_cache
+import os
 
 class Settings(BaseSettings):
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    
     # Database
     DATABASE_URL: str = "sqlite:///./quark.db"
+    DB_POOL_SIZE: int = max(20, 2 * (os.cpu_count() or 1))
+    DB_MAX_OVERFLOW: Optional[int] = None  # Defaults to 2 * DB_POOL_SIZE
+    DB_POOL_TIMEOUT: int = 5
+    DB_POOL_RECYCLE: int = 1800
     
     # Security
     JWT_SECRET: str = "your-secret-key"
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Browser origins allowed to call the API with credentials
+    CORS_ORIGINS: List[str] = ["https://app.quark.local"]
+    
     # Resource Limits
     MAX_CPU_PERCENT: float = 80.0
     MAX_MEMORY_GB: int = 14
@@ -17,15 +29,29 @@ class Settings(BaseSettings):
     # Docker
     DOCKER_SOCK: str = "unix:///var/run/docker.sock"
     DOCKER_REGISTRY: Optional[str] = None
+    DOCKER_MAX_STATS_STREAMS: int = 64  # Containers with a live stats reader
     
     # Nginx
     NGINX_CONF_DIR: str = "/etc/nginx/sites-enabled"
+    NGINX_PID_FILE: str = "/var/run/nginx.pid"
+    NGINX_RELOAD_DELAY_SECONDS: float = 0.5
+    
+    # Serialization
+    FAST_SERIALIZE: bool = False
+    
+    # Cache
+    REDIS_URL: Optional[str] = None
+    CACHE_TTL_SECONDS: int = 60
     
     # GitHub
+    GITHUB_TOKEN: Optional[str] = None
     GITHUB_WEBHOOK_SECRET: Optional[str] = None
     
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
+
+@lru_cache()
+def get_settings() -> Settings:
+    """Return the process-wide settings, reading the environment only once"""
+    return Settings()
 
-settings = Settings() 
\ No newline at end of file
+settings = get_settings() 
\ No newline at end of file
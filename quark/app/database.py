@@ -1,20 +1,82 @@
-from sqlmodel import create_engine, Session, SQLModel
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
 from app.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Create SQLite engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Needed for SQLite
+def _async_database_url(url: str) -> str:
+    """Swap a sync driver URL for its asyncio equivalent"""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+def _engine_options(url: str) -> dict:
+    """Pool settings for the async engine"""
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":")):
+        # An in-memory database only exists on its one connection, so share it
+        return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": (
+            settings.DB_MAX_OVERFLOW
+            if settings.DB_MAX_OVERFLOW is not None
+            else 2 * settings.DB_POOL_SIZE
+        ),
+        # Fail fast instead of queueing requests behind an exhausted pool
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": True,
+        "pool_recycle": settings.DB_POOL_RECYCLE
+    }
+
+# Async engine used by endpoints so DB I/O does not block the event loop
+async_engine = create_async_engine(
+    _async_database_url(settings.DATABASE_URL),
+    **_engine_options(settings.DATABASE_URL)
+)
+
+if async_engine.dialect.name == "sqlite":
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Use WAL so readers don't block on writers, and skip the fsync per commit"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.execute("PRAGMA cache_size=-64000")
+        cursor.close()
+
+async_session_maker = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autoflush=False
 )
 
-def get_session():
-    with Session(engine) as session:
+def get_pool_status() -> dict:
+    """Report connection pool usage for the async engine"""
+    pool = async_engine.pool
+    status = {"status": pool.status()}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow()
+        )
+    return status
+
+async def get_async_session():
+    async with async_session_maker() as session:
         yield session
 
-def init_db():
+async def init_db():
     """Initialize the database, creating all tables"""
     try:
         # Import all models that need to be created
@@ -24,9 +86,10 @@ def init_db():
         
         # Create all tables
         logger.info("Creating database tables...")
-        SQLModel.metadata.create_all(engine)
+        async with async_engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
         logger.info("Database tables created successfully")
         
     except Exception as e:
         logger.error(f"Error initializing database: {str(e)}")
-        raise 
\ No newline at end of file
+        raise
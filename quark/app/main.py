@@ -1,15 +1,26 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from app.api import auth, apps, deployments, github, monitoring, ws
-from app.database import init_db
-from app.middleware.error_handler import error_handler_middleware
+from app.config import settings
+from app.database import init_db, get_pool_status
+from app.utils.cache import close_cache
+from app.services.github import close_github_session
+from app.utils.docker import close_docker_manager
+from app.utils.host_metrics import host_metrics
+from app.middleware.error_handler import ErrorHandlerMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from logging.handlers import QueueHandler, QueueListener
 import logging
+import queue
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging: request handlers only enqueue records, a background
+# thread formats and writes them so stderr I/O never blocks the event loop
+log_queue = queue.SimpleQueue()
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+log_listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+logging.basicConfig(level=settings.LOG_LEVEL, handlers=[QueueHandler(log_queue)])
 
 # Create logger
 logger = logging.getLogger(__name__)
@@ -18,20 +29,26 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="QUARK Deployment Platform",
     description="A modern application deployment and management platform",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
+# Explicit lists: wildcards combined with credentials make Starlette reflect
+# the request's origin and headers on every response
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, replace with actual origins
+    allow_origins=tuple(settings.CORS_ORIGINS),
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=("GET", "POST", "PUT", "DELETE", "OPTIONS"),
+    allow_headers=("authorization", "content-type"),
 )
 
 # Add error handler middleware
-app.middleware("http")(error_handler_middleware)
+app.add_middleware(ErrorHandlerMiddleware)
+
+# Outermost, so errors turned into 500s by the handler are counted too
+app.add_middleware(MetricsMiddleware)
 
 # Mount routers without additional prefixes since they already have their own
 app.include_router(auth.router)  # Already has /auth prefix
@@ -41,11 +58,37 @@ app.include_router(github.router)  # Already has /github prefix
 app.include_router(monitoring.router)  # Already has /metrics prefix
 app.include_router(ws.router)  # Already has /ws prefix
 
+# Lifespans can overlap when one process serves the app twice (e.g. nested
+# TestClients); the listener runs while any of them is active
+_active_lifespans = 0
+
 @app.on_event("startup")
 async def startup_event():
-    init_db()
+    global _active_lifespans
+    if _active_lifespans == 0:
+        log_listener.start()
+    _active_lifespans += 1
+    await host_metrics.read()
+    await init_db()
     logger.info("Application started, database initialized")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    global _active_lifespans
+    await close_cache()
+    await close_github_session()
+    await close_docker_manager()
+    _active_lifespans -= 1
+    if _active_lifespans == 0:
+        log_listener.stop()
+
+# Load balancer probes hit this constantly, so the body is built once
+_HEALTHY_BODY = b'{"status":"healthy"}'
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"} 
\ No newline at end of file
+    return Response(content=_HEALTHY_BODY, media_type="application/json")
+
+@app.get("/health/db")
+async def db_health_check():
+    return get_pool_status()
@@ -1,99 +1,128 @@
-from fastapi import Request, status
-from fastapi.responses import JSONResponse
+from fastapi import status
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from app.utils.errors import QuarkError
 import logging
-from typing import Union, Dict
+from typing import Tuple
 import traceback
 from sqlalchemy.exc import SQLAlchemyError
 from docker.errors import DockerException
 from github import GithubException
-import json
-import uuid
+import orjson
+import os
+import threading
 
 logger = logging.getLogger(__name__)
 
-async def error_handler_middleware(request: Request, call_next):
-    """Global error handler middleware"""
-    try:
-        response = await call_next(request)
-        return response
-    except Exception as exc:
-        error_id = str(uuid.uuid4())
-        
-        if isinstance(exc, QuarkError):
-            # Handle custom application errors
-            logger.error(f"Application error: {exc.code} - {exc.message}", 
-                        extra={"details": exc.details})
-            return JSONResponse(
-                status_code=exc.status_code,
-                content=exc.to_dict()
-            )
+# Static parts of the common 500 bodies; only the error id and message are spliced in per error
+_DB_ERROR_PREFIX = b'{"code":"DATABASE_ERROR","message":"Database operation failed","error_id":"'
+_DOCKER_ERROR_PREFIX = b'{"code":"DOCKER_ERROR","message":"Docker operation failed","error_id":"'
+_INTERNAL_ERROR_PREFIX = b'{"code":"INTERNAL_SERVER_ERROR","message":"An unexpected error occurred","error_id":"'
+_ERROR_MID = b'","details":{"error":'
+_SUFFIX = b'}}'
+_INTERNAL_ERROR_SUFFIX = b',"support_message":"Please contact support with this error ID"}}'
+
+# Random bytes for error ids, refilled in bulk to amortize the urandom syscall
+_RAND_BUF = bytearray()
+_RAND_LOCK = threading.Lock()
+
+class ErrorHandlerMiddleware:
+    """Global error handler, as a pure ASGI middleware so responses stream untouched"""
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        elif isinstance(exc, SQLAlchemyError):
-            # Handle database errors
-            logger.error(f"Database error: {str(exc)}", exc_info=True)
-            return JSONResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                content={
-                    "code": "DATABASE_ERROR",
-                    "message": "Database operation failed",
-                    "error_id": error_id,
-                    "details": {"error": str(exc)}
-                }
-            )
+        response_started = False
         
-        elif isinstance(exc, DockerException):
-            # Handle Docker-related errors
-            logger.error(f"Docker error: {str(exc)}", exc_info=True)
-            return JSONResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                content={
-                    "code": "DOCKER_ERROR",
-                    "message": "Docker operation failed",
-                    "error_id": error_id,
-                    "details": {"error": str(exc)}
-                }
-            )
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
         
-        elif isinstance(exc, GithubException):
-            # Handle GitHub API errors
-            logger.error(f"GitHub API error: {exc.data.get('message')}", exc_info=True)
-            return JSONResponse(
-                status_code=status.HTTP_502_BAD_GATEWAY,
-                content={
-                    "code": "GITHUB_ERROR",
-                    "message": "GitHub operation failed",
-                    "error_id": error_id,
-                    "details": exc.data
-                }
-            )
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            # Too late for an error response once headers have gone out
+            if response_started:
+                raise
+            status_code, body = _error_response(exc, scope)
+            await _send_json(send, status_code, body)
+
+async def _send_json(send: Send, status_code: int, body: bytes) -> None:
+    """Emit a complete JSON response directly on the ASGI channel"""
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode())
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+def _templated_body(prefix: bytes, error_id: str, error: str, suffix: bytes = _SUFFIX) -> bytes:
+    """Splice the dynamic fields into a precomputed error body"""
+    return b"".join((prefix, error_id.encode(), _ERROR_MID, orjson.dumps(error), suffix))
+
+def _error_response(exc: Exception, scope: Scope) -> Tuple[int, bytes]:
+    """Log an exception and build the status code and JSON body describing it"""
+    error_id = generate_error_id()
+    
+    if isinstance(exc, QuarkError):
+        # Handle custom application errors
+        logger.error(f"Application error: {exc.code} - {exc.message}", 
+                    extra={"details": exc.details})
+        return exc.status_code, orjson.dumps(exc.to_dict(), default=str)
+    
+    elif isinstance(exc, SQLAlchemyError):
+        # Handle database errors
+        logger.error(f"Database error: {str(exc)}", exc_info=True)
+        return status.HTTP_500_INTERNAL_SERVER_ERROR, _templated_body(_DB_ERROR_PREFIX, error_id, str(exc))
+    
+    elif isinstance(exc, DockerException):
+        # Handle Docker-related errors
+        logger.error(f"Docker error: {str(exc)}", exc_info=True)
+        return status.HTTP_500_INTERNAL_SERVER_ERROR, _templated_body(_DOCKER_ERROR_PREFIX, error_id, str(exc))
+    
+    elif isinstance(exc, GithubException):
+        # Handle GitHub API errors
+        logger.error(f"GitHub API error: {exc.data.get('message')}", exc_info=True)
+        return status.HTTP_502_BAD_GATEWAY, orjson.dumps({
+            "code": "GITHUB_ERROR",
+            "message": "GitHub operation failed",
+            "error_id": error_id,
+            "details": exc.data
+        }, default=str)
+    
+    else:
+        # Handle unexpected errors
+        logger.critical(
+            f"Unexpected error: {str(exc)}",
+            extra={
+                "error_id": error_id,
+                "path": scope["path"],
+                "method": scope["method"],
+                "traceback": traceback.format_exc()
+            },
+            exc_info=True
+        )
         
-        else:
-            # Handle unexpected errors
-            logger.critical(
-                f"Unexpected error: {str(exc)}",
-                extra={
-                    "error_id": error_id,
-                    "path": request.url.path,
-                    "method": request.method,
-                    "traceback": traceback.format_exc()
-                },
-                exc_info=True
-            )
-            
-            return JSONResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                content={
-                    "code": "INTERNAL_SERVER_ERROR",
-                    "message": "An unexpected error occurred",
-                    "error_id": error_id,
-                    "details": {
-                        "error": str(exc) if str(exc) else "Unknown error",
-                        "support_message": "Please contact support with this error ID"
-                    }
-                }
-            )
+        return status.HTTP_500_INTERNAL_SERVER_ERROR, _templated_body(
+            _INTERNAL_ERROR_PREFIX,
+            error_id,
+            str(exc) or "Unknown error",
+            _INTERNAL_ERROR_SUFFIX
+        )
 
 def generate_error_id() -> str:
     """Generate a unique error ID for tracking"""
-    return str(uuid.uuid4()) 
\ No newline at end of file
+    with _RAND_LOCK:
+        if len(_RAND_BUF) < 16:
+            _RAND_BUF.extend(os.urandom(2048))
+        chunk = bytes(_RAND_BUF[:16])
+        del _RAND_BUF[:16]
+    return chunk.hex() 
\ No newline at end of file
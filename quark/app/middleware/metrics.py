@@ -0,0 +1,44 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.monitoring import REQUEST_COUNT, RESPONSE_TIME
+import time
+
+# Status codes are recorded by class so each route has at most five status series
+_STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+
+def route_template(scope: Scope) -> str:
+    """Return the matched route's path template, never the raw request path"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unknown"
+
+class MetricsMiddleware:
+    """Record request counts and latency labelled by route template"""
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            method = scope["method"]
+            endpoint = route_template(scope)
+            REQUEST_COUNT.labels(
+                method=method,
+                endpoint=endpoint,
+                status_class=_STATUS_CLASSES[min(max(status_code // 100, 1), 5) - 1]
+            ).inc()
+            RESPONSE_TIME.labels(method=method, endpoint=endpoint).observe(
+                time.perf_counter() - start
+            )
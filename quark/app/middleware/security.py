@@ -1,32 +1,81 @@
-from fastapi import Request
-from fastapi.responses import JSONResponse
-from typing import Callable
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Dict, Tuple
 import logging
+import time
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Appended to every HTTP response; built once instead of per request
+SECURITY_HEADERS = (
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+)
+
+RATE_LIMITED_BODY = b'{"detail":"Too many requests"}'
+
+# Per-client token buckets held in memory: (tokens, last refill time)
+_RATE = 100.0  # Tokens added per second
+_BURST = 200.0  # Bucket capacity
+_SWEEP_EVERY = 10_000  # Requests between prunes of idle buckets
+
 class SecurityMiddleware:
-    def __init__(self, app):
+    def __init__(self, app: ASGIApp):
         self.app = app
+        self.buckets: Dict[str, Tuple[float, float]] = {}
+        self.requests = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def __call__(self, request: Request, call_next: Callable):
         # Rate limiting check
-        if not await self._check_rate_limit(request):
-            return JSONResponse(
-                status_code=429,
-                content={"detail": "Too many requests"}
-            )
-
-        # Add security headers
-        response = await call_next(request)
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+        if not self._check_rate_limit(scope):
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(RATE_LIMITED_BODY)).encode()),
+                    *SECURITY_HEADERS
+                ]
+            })
+            await send({"type": "http.response.body", "body": RATE_LIMITED_BODY})
+            return
+
+        # Add security headers as the response starts; the body streams untouched
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *SECURITY_HEADERS]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _check_rate_limit(self, scope: Scope) -> bool:
+        """Take a token from the client's bucket, False when it is empty"""
+        client = scope.get("client")
+        key = client[0] if client else ""
+        now = time.monotonic()
+        
+        self.requests += 1
+        if self.requests % _SWEEP_EVERY == 0:
+            self._prune(now)
         
-        return response
+        tokens, last = self.buckets.get(key, (_BURST, now))
+        tokens = min(_BURST, tokens + (now - last) * _RATE)
+        if tokens < 1:
+            self.buckets[key] = (tokens, now)
+            return False
+        self.buckets[key] = (tokens - 1, now)
+        return True
 
-    async def _check_rate_limit(self, request: Request) -> bool:
-        # Implement rate limiting logic here
-        return True 
\ No newline at end of file
+    def _prune(self, now: float) -> None:
+        """Forget clients idle long enough for their bucket to have refilled"""
+        idle = _BURST / _RATE
+        self.buckets = {
+            key: bucket for key, bucket in self.buckets.items()
+            if now - bucket[1] < idle
+        }
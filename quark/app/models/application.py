@@ -1,8 +1,30 @@
-from sqlmodel import SQLModel, Field
+from sqlmodel import SQLModel, Field, Column, JSON
+from sqlalchemy import Index, text
 from typing import Optional, Dict
 from datetime import datetime
+from enum import Enum
+
+class AppStatus(str, Enum):
+    CREATED = "created"
+    BUILDING = "building"
+    RUNNING = "running"
+    FAILED = "failed"
+    STOPPED = "stopped"
+    UPDATING = "updating"
 
 class Application(SQLModel, table=True):
+    # Backs keyset pagination of an owner's apps ordered by (created_at, id)
+    __table_args__ = (
+        Index("ix_application_owner_created", "owner_id", "created_at", "id"),
+        # Partial index for the common "my running apps" dashboard filter
+        Index(
+            "ix_application_owner_running",
+            "owner_id", "created_at", "id",
+            postgresql_where=text("status = 'running'"),
+            sqlite_where=text("status = 'running'")
+        ),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(index=True)
     repo_url: str
@@ -10,9 +32,9 @@ class Application(SQLModel, table=True):
     cpu_limit: float
     memory_limit: int
     auto_deploy: bool = True
-    env_vars: Dict[str, str] = Field(default_factory=dict)
+    env_vars: Dict[str, str] = Field(default_factory=dict, sa_column=Column(JSON))
     owner_id: int = Field(foreign_key="user.id")
     status: str = Field(default="created")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
-    deployment_url: Optional[str] = None 
\ No newline at end of file
+    deployment_url: Optional[str] = None
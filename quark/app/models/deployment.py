@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
 from typing import Optional
 from datetime import datetime
 from enum import Enum
@@ -11,6 +12,11 @@ class DeploymentStatus(str, Enum):
     FAILED = "failed"
 
 class Deployment(SQLModel, table=True):
+    # Backs the "latest successful deployment of an app" lookups
+    __table_args__ = (
+        Index("ix_deployment_app_status_created", "application_id", "status", "created_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     application_id: int = Field(foreign_key="application.id")
     commit_sha: str
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 from datetime import datetime
 from app.models.deployment import DeploymentStatus
@@ -11,17 +11,16 @@ class DeploymentCreate(DeploymentBase):
     pass
 
 class DeploymentUpdate(BaseModel):
-    status: Optional[DeploymentStatus]
-    container_id: Optional[str]
-    logs: Optional[str]
+    status: Optional[DeploymentStatus] = None
+    container_id: Optional[str] = None
+    logs: Optional[str] = None
 
 class DeploymentResponse(DeploymentBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     status: DeploymentStatus
-    container_id: Optional[str]
-    logs: Optional[str]
+    container_id: Optional[str] = None
+    logs: Optional[str] = None
     created_at: datetime
-    updated_at: datetime
-
-    class Config:
-        orm_mode = True 
\ No newline at end of file
+    updated_at: datetime 
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Dict, List
+from typing import Any, Optional, Dict, List
 from datetime import datetime
 
 class SystemMetrics(BaseModel):
@@ -7,6 +7,7 @@ class SystemMetrics(BaseModel):
     memory_percent: float
     disk_percent: float
     timestamp: int
+    db_pool: Optional[Dict[str, Any]] = None
 
 class ContainerMetrics(BaseModel):
     cpu_usage: float
@@ -15,6 +16,14 @@ class ContainerMetrics(BaseModel):
     network_tx_bytes: int
     timestamp: int
 
+class AppLiveMetrics(BaseModel):
+    """Current usage of an application's active container"""
+    cpu_usage: float
+    memory_usage: float
+    network_rx: int
+    network_tx: int
+    timestamp: int
+
 class ApplicationMetrics(BaseModel):
     app_id: int
     containers: List[ContainerMetrics]
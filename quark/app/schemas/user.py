@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 from typing import Optional
 
 class UserBase(BaseModel):
@@ -9,12 +9,11 @@ class UserCreate(UserBase):
     password: str
 
 class UserResponse(UserBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     is_active: bool
 
-    class Config:
-        orm_mode = True
-
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer" 
\ No newline at end of file
@@ -1,28 +1,34 @@
-from typing import Optional
+from typing import List, Optional, Set
 from datetime import datetime
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlalchemy import update
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models.deployment import Deployment, DeploymentStatus
-from app.models.application import Application
-from app.utils.docker import DockerManager
-from app.utils.nginx import NginxManager
-from app.services.resource import ResourceManager
+from app.models.application import Application, AppStatus
+from app.utils.cache import application_namespace, cache_clear
+from app.utils.docker import container_ip, get_docker_manager, run_blocking
+from app.utils.nginx import get_nginx_manager
+from app.services.resource import get_resource_manager
 from app.tasks.deployment import cleanup_old_container, cleanup_failed_deployments
+from app.database import async_session_maker
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
 class DeploymentService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
-        self.docker = DockerManager()
-        self.nginx = NginxManager()
-        self.resource_manager = ResourceManager()
+        # Managers hold clients and config, so they are shared across services
+        self.docker = get_docker_manager()
+        self.nginx = get_nginx_manager()
+        self.resource_manager = get_resource_manager()
 
     async def create_deployment(self, application_id: int, commit_sha: str) -> Deployment:
         """Create a new deployment record"""
-        application = self.db.exec(
+        application = (await self.db.exec(
             select(Application).where(Application.id == application_id)
-        ).first()
+        )).first()
         if not application:
             raise ValueError("Application not found")
 
@@ -32,31 +38,45 @@ class DeploymentService:
             status=DeploymentStatus.PENDING
         )
         self.db.add(deployment)
-        self.db.commit()
-        self.db.refresh(deployment)
+        await self.db.commit()
+        await self.db.refresh(deployment)
         return deployment
 
+    async def bulk_trigger(self, deployment_ids: List[int]) -> None:
+        """Move a batch of pending deployments to building in one transaction"""
+        await self.db.exec(
+            update(Deployment)
+            .where(Deployment.id.in_(deployment_ids))
+            .where(Deployment.status == DeploymentStatus.PENDING)
+            .values(status=DeploymentStatus.BUILDING, updated_at=datetime.utcnow())
+        )
+        await self.db.commit()
+
     async def trigger_deployment(self, deployment_id: int) -> Deployment:
         """Execute the deployment process"""
-        deployment = self.db.get(Deployment, deployment_id)
+        deployment = await self.db.get(Deployment, deployment_id)
         if not deployment:
             raise ValueError("Deployment not found")
 
-        application = self.db.get(Application, deployment.application_id)
+        application = await self.db.get(Application, deployment.application_id)
         
         try:
-            # Update status to building
-            deployment.status = DeploymentStatus.BUILDING
-            self.db.commit()
+            # Update status to building, unless bulk_trigger already did
+            if deployment.status != DeploymentStatus.BUILDING:
+                deployment.status = DeploymentStatus.BUILDING
+            application.status = AppStatus.BUILDING
+            await self.db.commit()
+            await cache_clear(application_namespace(application.owner_id))
 
             # Build the image
-            image_tag = self.docker.build_image(
+            image_tag = await run_blocking(
+                self.docker.build_image,
                 application.repo_url,
                 deployment.commit_sha
             )
 
             # Check resource availability
-            if not self.resource_manager.check_availability(
+            if not await self.resource_manager.check_availability(
                 application.cpu_limit,
                 application.memory_limit
             ):
@@ -64,10 +84,11 @@ class DeploymentService:
 
             # Update status to deploying
             deployment.status = DeploymentStatus.DEPLOYING
-            self.db.commit()
+            await self.db.commit()
 
             # Start the new container
-            container = self.docker.run_container(
+            container = await run_blocking(
+                self.docker.run_container,
                 image_tag,
                 application.id,
                 application.cpu_limit,
@@ -76,53 +97,99 @@ class DeploymentService:
 
             # Update deployment with container ID
             deployment.container_id = container.id
-            self.db.commit()
+            await self.db.commit()
 
             # Health check
             if await self._check_health(container):
-                # Update Nginx configuration
-                self.nginx.update_config(application.id, container)
+                # Update Nginx configuration; the health check just refreshed the
+                # container's attrs, so its address needs no further dockerd call
+                await run_blocking(self.nginx.update_config, application.id, container_ip(container))
                 
                 # Schedule cleanup of old containers
                 await cleanup_old_container(application.id)
 
                 deployment.status = DeploymentStatus.SUCCESSFUL
+                application.status = AppStatus.RUNNING
             else:
                 raise Exception("Health check failed")
 
         except Exception as e:
-            logger.error(f"Deployment failed: {str(e)}")
+            logger.error("Deployment failed: %s", e)
             deployment.status = DeploymentStatus.FAILED
             deployment.logs = str(e)
+            application.status = AppStatus.FAILED
             
             # Cleanup failed deployment
             if deployment.container_id:
-                self.docker.stop_container(deployment.container_id)
+                await run_blocking(self.docker.stop_container, deployment.container_id)
 
         finally:
             deployment.updated_at = datetime.utcnow()
-            self.db.commit()
-            self.db.refresh(deployment)
+            application.updated_at = deployment.updated_at
+            await self.db.commit()
+            await self.db.refresh(deployment)
+            # Cached application pages show the status written above
+            await cache_clear(application_namespace(application.owner_id))
 
         return deployment
 
     async def _check_health(self, container: 'Container') -> bool:
         """Check if the container is healthy"""
         try:
-            # Wait for container to be ready
-            import time
-            time.sleep(5)  # Give the application time to start
+            # Poll for up to 5s without blocking the event loop, returning as soon as it runs
+            for _ in range(10):
+                await asyncio.sleep(0.5)
 
-            # Get container inspection info
-            info = container.inspect()
-            
-            # Check if container is running
-            if info["State"]["Running"]:
-                # You could add additional health checks here
-                # For example, making an HTTP request to a health endpoint
-                return True
+                # Refresh the container's inspection info
+                await run_blocking(container.reload)
+                
+                # Check if container is running
+                if container.attrs["State"]["Running"]:
+                    # You could add additional health checks here
+                    # For example, making an HTTP request to a health endpoint
+                    return True
             
             return False
         except Exception as e:
-            logger.error(f"Health check failed: {str(e)}")
-            return False 
\ No newline at end of file
+            logger.error("Health check failed: %s", e)
+            return False 
+
+async def run_deployment(deployment_id: int) -> None:
+    """Trigger a deployment with its own session, for use as a background task"""
+    async with async_session_maker() as db:
+        await DeploymentService(db).trigger_deployment(deployment_id)
+
+class DeploymentBatcher:
+    """Coalesces deployments submitted within a short window into one bulk_trigger"""
+    def __init__(self, window: float = 0.05):
+        self.window = window
+        self.queue: Optional[asyncio.Queue] = None
+        self.consumer: Optional[asyncio.Task] = None
+        self.running: Set[asyncio.Task] = set()
+
+    def submit(self, deployment_id: int) -> None:
+        """Queue a deployment to be triggered with the next batch"""
+        if self.consumer is None or self.consumer.done():
+            self.queue = asyncio.Queue()
+            self.consumer = asyncio.create_task(self._consume())
+        self.queue.put_nowait(deployment_id)
+
+    async def _consume(self) -> None:
+        while True:
+            deployment_ids = [await self.queue.get()]
+            await asyncio.sleep(self.window)
+            while not self.queue.empty():
+                deployment_ids.append(self.queue.get_nowait())
+            
+            try:
+                async with async_session_maker() as db:
+                    await DeploymentService(db).bulk_trigger(deployment_ids)
+            except Exception as e:
+                logger.error("Failed to mark deployments %s as building: %s", deployment_ids, e)
+            
+            for deployment_id in deployment_ids:
+                task = asyncio.create_task(run_deployment(deployment_id))
+                self.running.add(task)
+                task.add_done_callback(self.running.discard)
+
+deployment_batcher = DeploymentBatcher()
@@ -3,56 +3,51 @@ import aiohttp
 from fastapi import HTTPException, status
 from app.config import settings
 import logging
-import hmac
-import hashlib
 
 logger = logging.getLogger(__name__)
 
-class GitHubService:
-    def __init__(self):
-        self.base_url = "https://api.github.com"
-        self.headers = {
-            "Accept": "application/vnd.github.v3+json",
-            "Authorization": f"token {settings.GITHUB_TOKEN}"
-        }
+# One session for all GitHub API calls, so connections and TLS sessions are reused
+_session: Optional[aiohttp.ClientSession] = None
 
-    async def verify_webhook_signature(self, payload: bytes, signature: str) -> bool:
-        """Verify GitHub webhook signature"""
-        if not settings.GITHUB_WEBHOOK_SECRET:
-            logger.warning("GITHUB_WEBHOOK_SECRET not set, skipping signature verification")
-            return True
-
-        hmac_gen = hmac.new(
-            settings.GITHUB_WEBHOOK_SECRET.encode(),
-            msg=payload,
-            digestmod=hashlib.sha256
+def get_github_session() -> aiohttp.ClientSession:
+    """Return the shared GitHub API session, creating it on first use"""
+    global _session
+    if _session is None or _session.closed:
+        headers = {"Accept": "application/vnd.github.v3+json"}
+        if settings.GITHUB_TOKEN:
+            headers["Authorization"] = f"token {settings.GITHUB_TOKEN}"
+        _session = aiohttp.ClientSession(
+            headers=headers,
+            connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300)
         )
-        digest = f"sha256={hmac_gen.hexdigest()}"
-        
-        if not hmac.compare_digest(digest, signature):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Invalid webhook signature"
-            )
-        return True
+    return _session
+
+async def close_github_session() -> None:
+    """Close the shared GitHub API session"""
+    if _session is not None and not _session.closed:
+        await _session.close()
+
+class GitHubService:
+    def __init__(self, session: aiohttp.ClientSession):
+        self.base_url = "https://api.github.com"
+        self.session = session
 
     async def get_repository(self, owner: str, repo: str) -> Dict[str, Any]:
         """Get repository information"""
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            async with session.get(
-                f"{self.base_url}/repos/{owner}/{repo}"
-            ) as response:
-                if response.status == 404:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail="Repository not found"
-                    )
-                elif response.status != 200:
-                    raise HTTPException(
-                        status_code=status.HTTP_502_BAD_GATEWAY,
-                        detail="GitHub API error"
-                    )
-                return await response.json()
+        async with self.session.get(
+            f"{self.base_url}/repos/{owner}/{repo}"
+        ) as response:
+            if response.status == 404:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Repository not found"
+                )
+            elif response.status != 200:
+                raise HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail="GitHub API error"
+                )
+            return await response.json()
 
     async def create_deployment_status(
         self,
@@ -70,20 +65,19 @@ class GitHubService:
             "environment_url": environment_url
         }
         
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            async with session.post(
-                f"{self.base_url}/repos/{owner}/{repo}/deployments/{deployment_id}/statuses",
-                json=data
-            ) as response:
-                if response.status != 201:
-                    logger.error(
-                        f"Failed to create deployment status: {await response.text()}"
-                    )
-                    raise HTTPException(
-                        status_code=status.HTTP_502_BAD_GATEWAY,
-                        detail="Failed to update GitHub deployment status"
-                    )
-                return await response.json()
+        async with self.session.post(
+            f"{self.base_url}/repos/{owner}/{repo}/deployments/{deployment_id}/statuses",
+            json=data
+        ) as response:
+            if response.status != 201:
+                logger.error(
+                    f"Failed to create deployment status: {await response.text()}"
+                )
+                raise HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail="Failed to update GitHub deployment status"
+                )
+            return await response.json()
 
     async def get_commit(
         self,
@@ -92,18 +86,21 @@ class GitHubService:
         commit_sha: str
     ) -> Dict[str, Any]:
         """Get commit information"""
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            async with session.get(
-                f"{self.base_url}/repos/{owner}/{repo}/commits/{commit_sha}"
-            ) as response:
-                if response.status == 404:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail="Commit not found"
-                    )
-                elif response.status != 200:
-                    raise HTTPException(
-                        status_code=status.HTTP_502_BAD_GATEWAY,
-                        detail="GitHub API error"
-                    )
-                return await response.json() 
\ No newline at end of file
+        async with self.session.get(
+            f"{self.base_url}/repos/{owner}/{repo}/commits/{commit_sha}"
+        ) as response:
+            if response.status == 404:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Commit not found"
+                )
+            elif response.status != 200:
+                raise HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail="GitHub API error"
+                )
+            return await response.json()
+
+async def get_github_service() -> GitHubService:
+    """Dependency providing a GitHubService bound to the shared session"""
+    return GitHubService(get_github_session())
@@ -1,17 +1,24 @@
-from typing import Dict, List, Optional
-import psutil
-from prometheus_client import Gauge, CollectorRegistry, Counter, Histogram
-from app.utils.docker import DockerManager
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional
+from cachetools import TTLCache
+from prometheus_client import Gauge, Counter, Histogram
+from app.utils.docker import get_docker_manager
+from app.database import get_pool_status
+from app.utils.host_metrics import host_metrics, host_metrics_executor
+from app.models.application import Application
 from app.models.deployment import Deployment
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 import asyncio
 import time
+import weakref
 
 # Define Prometheus metrics
+# endpoint is the route template and status is bucketed (2xx, 4xx, ...) so the
+# series count is bounded by routes, not by ids in request paths
 REQUEST_COUNT = Counter(
     'http_requests_total',
     'Total number of HTTP requests',
-    ['method', 'endpoint', 'status']
+    ['method', 'endpoint', 'status_class']
 )
 
 RESPONSE_TIME = Histogram(
@@ -20,83 +27,151 @@ RESPONSE_TIME = Histogram(
     ['method', 'endpoint']
 )
 
+# Labelled by app only: every redeploy has a new container id, which
+# would otherwise add time series forever
 CPU_USAGE = Gauge(
     'app_cpu_usage_percent',
     'Application CPU usage percentage',
-    ['app_id', 'container_id']
+    ['app_id']
 )
 
 MEMORY_USAGE = Gauge(
     'app_memory_usage_bytes',
     'Application memory usage in bytes',
+    ['app_id']
+)
+
+HOST_CPU_USAGE = Gauge(
+    'host_cpu_usage_percent',
+    'Host CPU usage percentage'
+)
+
+HOST_MEMORY_USAGE = Gauge(
+    'host_memory_usage_percent',
+    'Host memory usage percentage'
+)
+
+# Info metric mapping each app to its current container (value is always 1)
+CONTAINER_INFO = Gauge(
+    'app_container_info',
+    'Container currently serving the application',
     ['app_id', 'container_id']
 )
+_info_containers: Dict[int, str] = {}
+
+def _set_container_info(app_id: int, container_id: str) -> None:
+    """Point the app's info series at its current container, dropping the previous one"""
+    previous = _info_containers.get(app_id)
+    if previous == container_id:
+        return
+    if previous is not None:
+        CONTAINER_INFO.remove(str(app_id), previous)
+    CONTAINER_INFO.labels(app_id=app_id, container_id=container_id).set(1)
+    _info_containers[app_id] = container_id
+
+# Connection pool gauges, read from the engine at scrape time
+DB_POOL_SIZE = Gauge('db_pool_size', 'Database connection pool size')
+DB_POOL_SIZE.set_function(lambda: get_pool_status().get("size", 0))
+DB_POOL_CHECKED_OUT = Gauge('db_pool_checked_out', 'Database connections currently in use')
+DB_POOL_CHECKED_OUT.set_function(lambda: get_pool_status().get("checked_out", 0))
+DB_POOL_OVERFLOW = Gauge('db_pool_overflow', 'Database connections opened beyond the pool size')
+DB_POOL_OVERFLOW.set_function(lambda: get_pool_status().get("overflow", 0))
+
+class _SingleFlightCache:
+    """Shares one recent result per key among concurrent callers"""
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.values: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # A key's lock lives only while some caller holds it, so keys that
+        # expired from values don't leave locks behind
+        self.locks: "weakref.WeakValueDictionary[Hashable, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    async def get(self, key: Hashable, produce: Callable[[], Awaitable[Dict]]) -> Dict:
+        value = self.values.get(key)
+        if value is not None:
+            return value
+        
+        lock = self.locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another caller may have refreshed it while we waited
+            value = self.values.get(key)
+            if value is None:
+                value = await produce()
+                self.values[key] = value
+            return value
+
+# Period of the background collection loop
+METRICS_INTERVAL_SECONDS = 15
+
+# Container of each app's latest deployment, re-resolved at most once per cycle
+_container_ids: TTLCache = TTLCache(maxsize=4096, ttl=METRICS_INTERVAL_SECONDS)
+
+# Metrics are identical within a second, so concurrent requests and the
+# websocket producers share a single collection
+_metrics_cache = _SingleFlightCache(ttl=1.0)
 
 class MonitoringService:
-    def __init__(self, db: Optional[Session] = None):
-        self.docker = DockerManager()
+    def __init__(self, db: Optional[AsyncSession] = None):
+        self.docker = get_docker_manager()
         self.db = db
-        self.registry = CollectorRegistry()
-        
-        # Prometheus metrics
-        self.cpu_gauge = Gauge(
-            "container_cpu_usage", 
-            "Container CPU Usage Percentage",
-            ["app_id", "container_id"],
-            registry=self.registry
-        )
-        self.memory_gauge = Gauge(
-            "container_memory_usage",
-            "Container Memory Usage MB",
-            ["app_id", "container_id"],
-            registry=self.registry
-        )
-        self.host_cpu_gauge = Gauge(
-            "host_cpu_usage",
-            "Host CPU Usage Percentage",
-            registry=self.registry
-        )
-        self.host_memory_gauge = Gauge(
-            "host_memory_usage",
-            "Host Memory Usage Percentage",
-            registry=self.registry
-        )
 
-    async def collect_container_metrics(self, app_id: int) -> Dict:
-        """Collect metrics for a specific application's container"""
-        deployment = self.db.exec(
-            select(Deployment)
-            .where(Deployment.application_id == app_id)
+    async def _latest_containers(self, app_ids: List[int]) -> Dict[int, str]:
+        """Map each application to the container of its latest successful deployment"""
+        rows = (await self.db.exec(
+            select(Deployment.application_id, Deployment.container_id)
+            .where(Deployment.application_id.in_(app_ids))
             .where(Deployment.status == "successful")
-            .order_by(Deployment.created_at.desc())
-        ).first()
-
-        if not deployment or not deployment.container_id:
-            return {"cpu_usage": 0, "memory_usage": 0}
+            .order_by(Deployment.application_id, Deployment.created_at.desc())
+        )).all()
+        
+        containers: Dict[int, str] = {}
+        for app_id, container_id in rows:
+            # Rows are newest first per application, so keep the first seen
+            containers.setdefault(app_id, container_id)
+        return {app_id: cid for app_id, cid in containers.items() if cid}
 
-        stats = self.docker.get_container_stats(deployment.container_id)
+    def _record_container_metrics(self, app_id: int, container_id: str) -> Dict:
+        """Read a container's stats and update the Prometheus gauges"""
+        stats = self.docker.get_container_stats(container_id)
         
         # Update Prometheus metrics
-        self.cpu_gauge.labels(
-            app_id=app_id,
-            container_id=deployment.container_id
-        ).set(stats["cpu_usage"])
-        
-        self.memory_gauge.labels(
-            app_id=app_id,
-            container_id=deployment.container_id
-        ).set(stats["memory_usage"])
+        CPU_USAGE.labels(app_id=app_id).set(stats["cpu_usage"])
+        MEMORY_USAGE.labels(app_id=app_id).set(stats["memory_usage"])
+        _set_container_info(app_id, container_id)
 
         return stats
 
-    async def collect_host_metrics(self) -> Dict:
+    async def _latest_container_id(self, app_id: int) -> Optional[str]:
+        """Container of the app's latest successful deployment, if it has one"""
+        container_id = _container_ids.get(app_id)
+        if container_id is None:
+            container_id = (await self.db.exec(
+                select(Deployment.container_id)
+                .where(Deployment.application_id == app_id)
+                .where(Deployment.status == "successful")
+                .order_by(Deployment.created_at.desc())
+                .limit(1)
+            )).first()
+            # Misses aren't cached so a first deployment shows up immediately
+            if container_id:
+                _container_ids[app_id] = container_id
+        return container_id
+
+    async def collect_container_metrics(self, app_id: int) -> Dict:
+        """Collect metrics for a specific application's container"""
+        container_id = await self._latest_container_id(app_id)
+        if not container_id:
+            return {"cpu_usage": 0, "memory_usage": 0}
+
+        return self._record_container_metrics(app_id, container_id)
+
+    def collect_host_metrics(self) -> Dict:
         """Collect host system metrics"""
-        cpu_percent = psutil.cpu_percent()
-        memory = psutil.virtual_memory()
+        host = host_metrics.get()
+        cpu_percent, memory = host["cpu_percent"], host["memory"]
         
         # Update Prometheus metrics
-        self.host_cpu_gauge.set(cpu_percent)
-        self.host_memory_gauge.set(memory.percent)
+        HOST_CPU_USAGE.set(cpu_percent)
+        HOST_MEMORY_USAGE.set(memory.percent)
         
         return {
             "cpu_usage": cpu_percent,
@@ -106,51 +181,45 @@ class MonitoringService:
 
     async def start_metrics_collection(self, app_ids: List[int]) -> None:
         """Start collecting metrics for multiple applications"""
+        # Tick on a fixed monotonic schedule so slow cycles don't push later ones back
+        next_tick = time.monotonic()
         while True:
             # Collect host metrics
-            await self.collect_host_metrics()
+            await asyncio.get_running_loop().run_in_executor(
+                host_metrics_executor, self.collect_host_metrics
+            )
             
-            # Collect container metrics for each app
-            for app_id in app_ids:
-                await self.collect_container_metrics(app_id)
+            # Look up every app's container in one query, then collect
+            containers = await self._latest_containers(app_ids)
+            for app_id, container_id in containers.items():
+                self._record_container_metrics(app_id, container_id)
             
-            await asyncio.sleep(15)  # Collect every 15 seconds 
+            # After an overrun, start the next cycle now rather than bursting to catch up
+            next_tick = max(next_tick + METRICS_INTERVAL_SECONDS, time.monotonic())
+            await asyncio.sleep(next_tick - time.monotonic())
 
     async def get_app_metrics(self, app_id: int) -> Dict:
         """Get real-time metrics for an application"""
+        return await _metrics_cache.get(("app", app_id), lambda: self._collect_app_metrics(app_id))
+
+    async def _collect_app_metrics(self, app_id: int) -> Dict:
+        """Read the stats of an application's active container"""
         try:
             # Get application and its active deployment
-            app = self.db.exec(
+            app = (await self.db.exec(
                 select(Application)
                 .where(Application.id == app_id)
-            ).first()
+            )).first()
             
             if not app:
                 return {"error": "Application not found"}
 
-            deployment = self.db.exec(
-                select(Deployment)
-                .where(Deployment.application_id == app_id)
-                .where(Deployment.status == "successful")
-                .order_by(Deployment.created_at.desc())
-            ).first()
-
-            if not deployment or not deployment.container_id:
+            container_id = await self._latest_container_id(app_id)
+            if not container_id:
                 return {"error": "No active deployment found"}
 
-            # Get container stats
-            stats = self.docker.get_container_stats(deployment.container_id)
-            
-            # Update Prometheus metrics
-            CPU_USAGE.labels(
-                app_id=app_id,
-                container_id=deployment.container_id
-            ).set(stats["cpu_usage"])
-            
-            MEMORY_USAGE.labels(
-                app_id=app_id,
-                container_id=deployment.container_id
-            ).set(stats["memory_usage"])
+            # Get container stats and update Prometheus metrics
+            stats = self._record_container_metrics(app_id, container_id)
 
             return {
                 "cpu_usage": stats["cpu_usage"],
@@ -165,9 +234,19 @@ class MonitoringService:
 
     async def get_system_metrics(self) -> Dict:
         """Get system-wide metrics"""
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
+        # A cache refresh reads /proc and statvfs, so it runs in a worker thread
+        return await _metrics_cache.get(
+            "system",
+            lambda: asyncio.get_running_loop().run_in_executor(
+                host_metrics_executor, self._collect_system_metrics
+            )
+        )
+
+    def _collect_system_metrics(self) -> Dict:
+        """Sample host CPU, memory and disk usage"""
+        # One shared read cycle covers CPU, memory and disk
+        host = host_metrics.get()
+        cpu_percent, memory, disk = host["cpu_percent"], host["memory"], host["disk"]
         
         return {
             "cpu_percent": cpu_percent,
@@ -1,18 +1,22 @@
-from typing import Dict, Optional
-import psutil
+from typing import Dict, List, Optional
+from functools import lru_cache
 from app.config import settings
-from app.utils.docker import DockerManager
-from sqlmodel import Session, select
+from app.utils.docker import get_docker_manager
+from app.utils.host_metrics import host_metrics
+from sqlmodel import select
+from sqlalchemy import and_, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models.application import Application
+from app.models.deployment import Deployment, DeploymentStatus
 
 class ResourceManager:
-    def __init__(self, db: Optional[Session] = None):
-        self.docker = DockerManager()
+    def __init__(self, db: Optional[AsyncSession] = None):
+        self.docker = get_docker_manager()
         self.db = db
 
-    def check_availability(self, cpu_request: float, memory_request: int) -> bool:
+    async def check_availability(self, cpu_request: float, memory_request: int) -> bool:
         """Check if requested resources are available"""
-        current_usage = self.get_current_usage()
+        current_usage = await self.get_current_usage()
         
         # Calculate total requested resources including the new request
         total_cpu = current_usage["cpu_percent"] + cpu_request
@@ -22,26 +26,23 @@ class ResourceManager:
         return (total_cpu <= settings.MAX_CPU_PERCENT and
                 total_memory <= settings.MAX_MEMORY_GB * 1024)
 
-    def get_current_usage(self) -> Dict:
+    async def get_current_usage(self) -> Dict:
         """Get current resource usage"""
-        # Get host metrics
-        cpu_percent = psutil.cpu_percent()
-        memory = psutil.virtual_memory()
+        # Get each application's live container in one query if db is available
+        rows = []
+        if self.db:
+            rows = (await self.db.exec(self._live_containers_query())).all()
         
-        # Get container metrics if db is available
+        # Stats come from the in-memory streams, so summing them never waits on dockerd
         container_cpu = 0.0
         container_memory = 0
+        for _, container_id in rows:
+            stats = self.docker.get_container_stats(container_id)
+            container_cpu += stats["cpu_usage"]
+            container_memory += stats["memory_usage"]
         
-        if self.db:
-            # Get all running applications
-            applications = self.db.exec(
-                select(Application)
-            ).all()
-            
-            for app in applications:
-                stats = self.docker.get_container_stats(app.id)
-                container_cpu += stats["cpu_usage"]
-                container_memory += stats["memory_usage"]
+        host = await host_metrics.read()
+        cpu_percent, memory = host["cpu_percent"], host["memory"]
         
         return {
             "cpu_percent": container_cpu,
@@ -51,9 +52,32 @@ class ResourceManager:
             "host_memory_available": memory.available / (1024 * 1024)  # MB
         }
 
-    def allocate_resources(self, app_id: int, cpu: float, memory: int) -> bool:
+    @staticmethod
+    def _live_containers_query():
+        """(app_id, container_id) of each application's latest successful deployment"""
+        latest = (
+            select(
+                Deployment.application_id,
+                func.max(Deployment.created_at).label("created_at")
+            )
+            .where(Deployment.status == DeploymentStatus.SUCCESSFUL)
+            .group_by(Deployment.application_id)
+            .subquery()
+        )
+        return (
+            select(Application.id, Deployment.container_id)
+            .join(Deployment, Deployment.application_id == Application.id)
+            .join(latest, and_(
+                latest.c.application_id == Deployment.application_id,
+                latest.c.created_at == Deployment.created_at
+            ))
+            .where(Deployment.status == DeploymentStatus.SUCCESSFUL)
+            .where(Deployment.container_id.isnot(None))
+        )
+
+    async def allocate_resources(self, app_id: int, cpu: float, memory: int) -> bool:
         """Allocate resources for an application"""
-        if not self.check_availability(cpu, memory):
+        if not await self.check_availability(cpu, memory):
             return False
             
         # Resources are available, allocation happens when container starts
@@ -62,4 +86,9 @@ class ResourceManager:
     def release_resources(self, app_id: int) -> None:
         """Release resources allocated to an application"""
         # Resources are automatically released when container stops
-        pass 
\ No newline at end of file
+        pass
+
+@lru_cache()
+def get_resource_manager() -> ResourceManager:
+    """Return the process-wide resource manager"""
+    return ResourceManager()
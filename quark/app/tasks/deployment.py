@@ -1,7 +1,7 @@
-from app.utils.docker import DockerManager
+from app.utils.docker import get_docker_manager, run_blocking
 from app.models.deployment import Deployment
-from sqlmodel import Session, select
-from app.database import engine
+from sqlmodel import select
+from app.database import async_session_maker
 import logging
 import asyncio
 
@@ -10,22 +10,23 @@ logger = logging.getLogger(__name__)
 async def cleanup_old_container(app_id: int) -> None:
     """Clean up old containers for an application"""
     try:
-        docker = DockerManager()
+        docker = get_docker_manager()
         
-        with Session(engine) as db:
+        async with async_session_maker() as db:
             # Get previous successful deployment
-            old_deployment = db.exec(
+            old_deployment = (await db.exec(
                 select(Deployment)
                 .where(Deployment.application_id == app_id)
                 .where(Deployment.status == "successful")
                 .order_by(Deployment.created_at.desc())
-            ).first()
+                .limit(1)
+            )).first()
 
             if old_deployment and old_deployment.container_id:
                 logger.info(f"Cleaning up old container {old_deployment.container_id}")
-                docker.stop_container(old_deployment.container_id)
+                await run_blocking(docker.stop_container, old_deployment.container_id)
                 old_deployment.container_id = None
-                db.commit()
+                await db.commit()
 
     except Exception as e:
         logger.error(f"Failed to cleanup old container: {str(e)}")
@@ -34,20 +35,20 @@ async def cleanup_old_container(app_id: int) -> None:
 async def cleanup_failed_deployments() -> None:
     """Clean up failed deployment containers"""
     try:
-        docker = DockerManager()
+        docker = get_docker_manager()
         
-        with Session(engine) as db:
-            failed_deployments = db.exec(
+        async with async_session_maker() as db:
+            failed_deployments = (await db.exec(
                 select(Deployment)
                 .where(Deployment.status == "failed")
                 .where(Deployment.container_id.isnot(None))
-            ).all()
+            )).all()
 
             for deployment in failed_deployments:
                 logger.info(f"Cleaning up failed deployment container {deployment.container_id}")
-                docker.stop_container(deployment.container_id)
+                await run_blocking(docker.stop_container, deployment.container_id)
                 deployment.container_id = None
-                db.commit()
+                await db.commit()
 
     except Exception as e:
         logger.error(f"Failed to cleanup failed deployments: {str(e)}")
@@ -1,36 +1,113 @@
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import secrets
+import time
+from cachetools import TTLCache
+import jwt
+from jwt import PyJWTError
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
+import bcrypt
 from fastapi import Depends, HTTPException, status, WebSocket
 from fastapi.security import OAuth2PasswordBearer
 from app.config import settings
 from app.models.user import User
-from sqlmodel import Session, select
-from app.database import get_session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_session
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+# Verified against when a login names an unknown user, so both paths cost the same
+DUMMY_PASSWORD_HASH = password_hasher.hash("quark-dummy-password")
+# argon2 releases the GIL, so hashing in threads keeps the event loop free
+hash_executor = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 1,
+    thread_name_prefix="password-hash"
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+# Signing key encoded once rather than on every encode/decode
+_JWT_KEY = settings.JWT_SECRET.encode()
+_JWT_ALGORITHMS = [settings.JWT_ALGORITHM]
+
+# Decoded payloads keyed by a token digest, so raw tokens are not kept in memory
+_token_cache: TTLCache = TTLCache(maxsize=4096, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+# Authenticated users by email; bounds how stale a cached user can be
+_user_cache: TTLCache = TTLCache(maxsize=4096, ttl=30)
+# Digests of logged-out tokens, kept as long as such a token could still be valid
+_revoked_tokens: TTLCache = TTLCache(maxsize=65536, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+def clear_auth_caches() -> None:
+    """Drop all cached token payloads, users and revocations"""
+    _token_cache.clear()
+    _user_cache.clear()
+    _revoked_tokens.clear()
+
+def _token_key(token: str) -> bytes:
+    """Cache key for a token, so raw tokens are not kept in memory"""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+def revoke_token(token: str) -> None:
+    """Reject a token from now on, e.g. after logout"""
+    key = _token_key(token)
+    _revoked_tokens[key] = True
+    _token_cache.pop(key, None)
+
+def invalidate_user(email: str) -> None:
+    """Forget a cached user whose record changed"""
+    _user_cache.pop(email, None)
+
 async def verify_token(token: str) -> Dict[str, Any]:
     """Verify JWT token and return payload"""
     try:
         payload = jwt.decode(
             token, 
-            settings.JWT_SECRET, 
-            algorithms=["HS256"]
+            _JWT_KEY, 
+            algorithms=_JWT_ALGORITHMS
         )
         return payload
-    except JWTError:
+    except PyJWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication token",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+async def verify_token_cached(token: str) -> Dict[str, Any]:
+    """Verify JWT token, reusing the payload of a recently verified token"""
+    key = _token_key(token)
+    if key in _revoked_tokens:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    payload = _token_cache.get(key)
+    if payload is not None and payload["exp"] > time.time():
+        return payload
+    
+    payload = await verify_token(token)
+    if "exp" in payload:
+        _token_cache[key] = payload
+    return payload
+
+async def _cached_user(email: str, db: AsyncSession) -> Optional[User]:
+    """User by email; cached as a detached copy, so no request sees another's session"""
+    user = _user_cache.get(email)
+    if user is None:
+        row = (await db.exec(select(User).where(User.email == email))).first()
+        if row is None:
+            return None
+        user = _user_cache[email] = User.model_validate(row)
+    return user
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ) -> User:
     """Get current authenticated user"""
     credentials_exception = HTTPException(
@@ -40,20 +117,17 @@ async def get_current_user(
     )
     
     try:
-        payload = await verify_token(token)
+        payload = await verify_token_cached(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
-            
-        user = db.exec(
-            select(User).where(User.email == email)
-        ).first()
         
+        user = await _cached_user(email, db)
         if user is None:
             raise credentials_exception
         return user
         
-    except JWTError:
+    except PyJWTError:
         raise credentials_exception
 
 def create_access_token(
@@ -67,25 +141,42 @@ def create_access_token(
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     
-    to_encode.update({"exp": expire})
+    # jti keeps tokens issued in the same second distinct, so revoking one leaves the others
+    to_encode.update({"exp": expire, "jti": secrets.token_hex(8)})
     encoded_jwt = jwt.encode(
         to_encode,
-        settings.JWT_SECRET,
-        algorithm="HS256"
+        _JWT_KEY,
+        algorithm=settings.JWT_ALGORITHM
     )
     return encoded_jwt
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify password against hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    if hashed_password.startswith("$2"):
+        # Legacy bcrypt hash from before the switch to argon2id; bcrypt only
+        # ever looked at the first 72 bytes, and newer releases reject more
+        try:
+            return bcrypt.checkpw(plain_password.encode()[:72], hashed_password.encode())
+        except ValueError:
+            return False
+    try:
+        return password_hasher.verify(hashed_password, plain_password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Check if a hash is legacy bcrypt or uses outdated argon2 parameters"""
+    if hashed_password.startswith("$2"):
+        return True
+    return password_hasher.check_needs_rehash(hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Generate password hash"""
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
 
 async def get_current_user_ws(
     websocket: WebSocket,
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ) -> User:
     try:
         token = websocket.headers.get("authorization")
@@ -96,20 +187,20 @@ async def get_current_user_ws(
             )
         
         token = token.split(" ")[1]
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+        payload = await verify_token_cached(token)
         email: str = payload.get("sub")
         if email is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials",
             )
-    except JWTError:
+    except PyJWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
         )
         
-    user = db.exec(select(User).where(User.email == email)).first()
+    user = await _cached_user(email, db)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
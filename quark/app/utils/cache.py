@@ -0,0 +1,77 @@
+from typing import Any, Optional
+import redis.asyncio as redis
+import orjson
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Caching is disabled when no Redis URL is configured
+client: Optional[redis.Redis] = redis.from_url(settings.REDIS_URL) if settings.REDIS_URL else None
+
+def application_namespace(owner_id: int) -> str:
+    """Namespace holding every cached response for an owner's applications"""
+    return f"app:{owner_id}"
+
+async def cache_get_raw(key: str) -> Optional[bytes]:
+    """Return the cached JSON bytes for key, or None on miss"""
+    if client is None:
+        return None
+    try:
+        return await client.get(key)
+    except redis.RedisError as e:
+        logger.warning("Cache read failed for %s: %s", key, e)
+        return None
+
+async def cache_set_raw(key: str, value: bytes, expire: int = settings.CACHE_TTL_SECONDS) -> None:
+    """Store already-serialized JSON bytes under key"""
+    if client is None:
+        return
+    try:
+        await client.set(key, value, ex=expire)
+    except redis.RedisError as e:
+        logger.warning("Cache write failed for %s: %s", key, e)
+
+async def cache_get(key: str) -> Optional[Any]:
+    """Return the cached value for key, or None on miss"""
+    value = await cache_get_raw(key)
+    return orjson.loads(value) if value is not None else None
+
+async def cache_set(key: str, value: Any, expire: int = settings.CACHE_TTL_SECONDS) -> None:
+    """Store a JSON-serializable value under key"""
+    await cache_set_raw(key, orjson.dumps(value), expire)
+
+async def cache_add(key: str, expire: int = settings.CACHE_TTL_SECONDS) -> bool:
+    """Set key only if it is absent; True when this call created it"""
+    if client is None:
+        return True
+    try:
+        return bool(await client.set(key, b"1", ex=expire, nx=True))
+    except redis.RedisError as e:
+        logger.warning("Cache write failed for %s: %s", key, e)
+        return True
+
+async def cache_delete(key: str) -> None:
+    """Delete a single key"""
+    if client is None:
+        return
+    try:
+        await client.delete(key)
+    except redis.RedisError as e:
+        logger.warning("Cache delete failed for %s: %s", key, e)
+
+async def cache_clear(namespace: str) -> None:
+    """Delete every key under namespace"""
+    if client is None:
+        return
+    try:
+        keys = [key async for key in client.scan_iter(match=f"{namespace}:*")]
+        if keys:
+            await client.delete(*keys)
+    except redis.RedisError as e:
+        logger.warning("Cache clear failed for %s: %s", namespace, e)
+
+async def close_cache() -> None:
+    """Close the Redis connection pool"""
+    if client is not None:
+        await client.close()
@@ -1,30 +1,104 @@
 import docker
 import tempfile
+import io
 import os
 import git
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from functools import lru_cache
 from app.config import settings
+import asyncio
+import logging
+import threading
+
+# docker-py, git and nginx calls block for seconds during deploys; they get
+# their own threads so they don't queue behind the default executor's work
+DOCKER_EXECUTOR_WORKERS = 4
+docker_executor = ThreadPoolExecutor(max_workers=DOCKER_EXECUTOR_WORKERS, thread_name_prefix="docker")
+
+async def run_blocking(func: Callable[..., Any], *args: Any) -> Any:
+    """Run a blocking Docker/Nginx call on the docker executor"""
+    return await asyncio.get_running_loop().run_in_executor(docker_executor, func, *args)
+
+logger = logging.getLogger(__name__)
+
+_NO_STATS = {"cpu_usage": 0, "memory_usage": 0, "network_rx": 0, "network_tx": 0}
+
+def container_ip(container: "docker.models.containers.Container") -> str:
+    """IP of the container on its first network, from its last fetched attrs"""
+    networks = container.attrs["NetworkSettings"]["Networks"]
+    return next(iter(networks.values()))["IPAddress"]
+
+def _usage_from_frame(stats: Dict) -> Dict:
+    """CPU percentage, memory MB and network bytes from one stats frame, which carries the previous sample too"""
+    cpu_delta = stats["cpu_stats"]["cpu_usage"]["total_usage"] - \
+               stats["precpu_stats"]["cpu_usage"]["total_usage"]
+    system_delta = stats["cpu_stats"].get("system_cpu_usage", 0) - \
+                  stats["precpu_stats"].get("system_cpu_usage", 0)
+    cpu_usage = (cpu_delta / system_delta) * 100.0 if system_delta > 0 else 0.0
+    
+    memory_usage = stats["memory_stats"].get("usage", 0) / (1024 * 1024)  # Convert to MB
+    
+    # Byte counters since container start, summed over its networks
+    networks = (stats.get("networks") or {}).values()
+    
+    return {
+        "cpu_usage": cpu_usage,
+        "memory_usage": memory_usage,
+        "network_rx": sum(net.get("rx_bytes", 0) for net in networks),
+        "network_tx": sum(net.get("tx_bytes", 0) for net in networks)
+    }
 
 class DockerManager:
     def __init__(self):
-        self.client = docker.from_env()
+        # One connection per docker executor thread plus one per stats reader,
+        # so neither waits on the pool; readers are capped to keep it bounded
+        self.client = docker.from_env(
+            max_pool_size=DOCKER_EXECUTOR_WORKERS + settings.DOCKER_MAX_STATS_STREAMS
+        )
+        # Latest usage per container, kept current by one streaming reader each
+        self._latest: Dict[str, Dict] = {}
+        self._streams: Dict[str, threading.Event] = {}
+        self._streams_lock = threading.Lock()
 
     def build_image(self, repo_url: str, commit_sha: str) -> str:
-        """Clone repository and build Docker image"""
+        """Fetch the commit and build Docker image from its tree"""
         with tempfile.TemporaryDirectory() as temp_dir:
-            # Clone the repository
-            repo = git.Repo.clone_from(repo_url, temp_dir)
-            repo.git.checkout(commit_sha)
+            repo = git.Repo.init(temp_dir, bare=True)
+            ref = self._fetch_commit(repo, repo_url, commit_sha)
+            
+            # Archive the commit straight into the build context; no worktree
+            # is written and the daemon doesn't re-tar a directory
+            context = io.BytesIO(
+                repo.git.archive(ref, format="tar", stdout_as_string=False)
+            )
 
             # Build the image
             image_tag = f"quark-app:{commit_sha}"
             self.client.images.build(
-                path=temp_dir,
+                fileobj=context,
+                custom_context=True,
                 tag=image_tag,
                 rm=True
             )
             return image_tag
 
+    @staticmethod
+    def _fetch_commit(repo: git.Repo, repo_url: str, commit_sha: str) -> str:
+        """Fetch a single commit without the history, returning the ref to read it from"""
+        repo.create_remote("origin", repo_url)
+        try:
+            # Protocol v2 lets servers such as GitHub serve a commit by its SHA
+            repo.git(c="protocol.version=2").fetch("--depth=1", "origin", commit_sha)
+        except git.GitCommandError as e:
+            # Servers that refuse SHA wants need the full history
+            logger.warning(
+                "Shallow fetch of %s failed, fetching full history: %s", commit_sha, e.stderr.strip()
+            )
+            repo.git.fetch("origin")
+            return commit_sha
+        return "FETCH_HEAD"
+
     def run_container(self, image_tag: str, app_id: int, cpu_limit: float, memory_limit: int) -> docker.models.containers.Container:
         """Run a container with resource limits"""
         container = self.client.containers.run(
@@ -38,35 +112,93 @@ class DockerManager:
                 "APP_ID": str(app_id)
             }
         )
+        self.watch_stats(container.id)
         return container
 
-    def get_container_stats(self, container_id: str) -> Dict:
-        """Get container resource usage statistics"""
+    def watch_stats(self, container_id: str) -> None:
+        """Start a background reader keeping the container's latest stats in memory"""
+        with self._streams_lock:
+            if container_id in self._streams:
+                return
+            if len(self._streams) >= settings.DOCKER_MAX_STATS_STREAMS:
+                # Past the cap the container reports zero usage instead of
+                # queueing a reader on the connection pool
+                logger.warning(
+                    "Not watching stats for %s: %d readers already running",
+                    container_id, len(self._streams)
+                )
+                return
+            stop = self._streams[container_id] = threading.Event()
+        threading.Thread(
+            target=self._read_stats,
+            args=(container_id, stop),
+            name=f"docker-stats-{container_id[:12]}",
+            daemon=True
+        ).start()
+
+    def _read_stats(self, container_id: str, stop: threading.Event) -> None:
+        """Consume the container's stats stream until it ends or is stopped"""
         try:
             container = self.client.containers.get(container_id)
-            stats = container.stats(stream=False)
-            
-            # Calculate CPU percentage and memory usage
-            cpu_delta = stats["cpu_stats"]["cpu_usage"]["total_usage"] - \
-                       stats["precpu_stats"]["cpu_usage"]["total_usage"]
-            system_delta = stats["cpu_stats"]["system_cpu_usage"] - \
-                          stats["precpu_stats"]["system_cpu_usage"]
-            cpu_usage = (cpu_delta / system_delta) * 100.0
-            
-            memory_usage = stats["memory_stats"]["usage"] / (1024 * 1024)  # Convert to MB
-            
-            return {
-                "cpu_usage": cpu_usage,
-                "memory_usage": memory_usage
-            }
+            for frame in container.stats(stream=True, decode=True):
+                if stop.is_set():
+                    break
+                try:
+                    self._latest[container_id] = _usage_from_frame(frame)
+                except KeyError:
+                    # Frames sent while the container starts or stops lack usage data
+                    continue
         except docker.errors.NotFound:
-            return {"cpu_usage": 0, "memory_usage": 0}
+            pass
+        except Exception as e:
+            logger.warning("Stats stream for %s failed: %s", container_id, e)
+        finally:
+            with self._streams_lock:
+                if self._streams.get(container_id) is stop:
+                    del self._streams[container_id]
+            self._latest.pop(container_id, None)
+
+    def unwatch_stats(self, container_id: str) -> None:
+        """Stop the container's stats reader and forget its samples"""
+        with self._streams_lock:
+            stop = self._streams.pop(container_id, None)
+        if stop is not None:
+            stop.set()
+        self._latest.pop(container_id, None)
+
+    def get_container_stats(self, container_id: str) -> Dict:
+        """Get container resource usage statistics from the in-memory stream"""
+        latest = self._latest.get(container_id)
+        if latest is None:
+            # Containers started before this process get a reader on first use;
+            # they report zero usage until its first frame arrives (about 1s)
+            self.watch_stats(container_id)
+            return dict(_NO_STATS)
+        return latest
 
     def stop_container(self, container_id: str) -> None:
         """Stop and remove a container"""
+        self.unwatch_stats(container_id)
         try:
             container = self.client.containers.get(container_id)
             container.stop(timeout=10)
             container.remove()
         except docker.errors.NotFound:
-            pass 
\ No newline at end of file
+            pass
+
+    def close(self) -> None:
+        """Stop every stats reader and close the client's connections"""
+        for container_id in list(self._streams):
+            self.unwatch_stats(container_id)
+        self.client.close()
+
+@lru_cache()
+def get_docker_manager() -> DockerManager:
+    """Return the process-wide Docker manager, so its client connection pool is reused"""
+    return DockerManager()
+
+async def close_docker_manager() -> None:
+    """Close the shared Docker manager, if one was created"""
+    if get_docker_manager.cache_info().currsize:
+        await run_blocking(get_docker_manager().close)
+        get_docker_manager.cache_clear()
@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+import asyncio
+import os
+import threading
+import time
+import psutil
+
+# psutil reads /proc and calls statvfs, which can stall on a busy host; these
+# reads get their own pool so they never queue behind Docker calls
+host_metrics_executor = ThreadPoolExecutor(
+    max_workers=min(32, (os.cpu_count() or 1) * 2),
+    thread_name_prefix="host-metrics"
+)
+
+class HostMetricsCache:
+    """Host CPU, memory and disk readings shared by every caller for up to ttl seconds"""
+    def __init__(self, ttl: float = 1.0):
+        self.ttl = ttl
+        self.values: Optional[Dict[str, Any]] = None
+        self.timestamp = 0.0
+        self.lock = threading.Lock()
+
+    def get(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        if self.values is not None and now - self.timestamp < self.ttl:
+            return self.values
+        
+        with self.lock:
+            if self.values is None or now - self.timestamp >= self.ttl:
+                # interval=None compares with the previous call instead of sleeping
+                self.values = {
+                    "cpu_percent": psutil.cpu_percent(interval=None),
+                    "memory": psutil.virtual_memory(),
+                    "disk": psutil.disk_usage("/")
+                }
+                self.timestamp = time.monotonic()
+            return self.values
+
+    async def read(self) -> Dict[str, Any]:
+        """Like get(), but a refresh runs on the host metrics executor"""
+        if self.values is not None and time.monotonic() - self.timestamp < self.ttl:
+            return self.values
+        return await asyncio.get_running_loop().run_in_executor(host_metrics_executor, self.get)
+
+# The first non-blocking cpu_percent() reading is meaningless, so the app
+# warms this up at startup
+host_metrics = HostMetricsCache()
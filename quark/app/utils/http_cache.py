@@ -0,0 +1,31 @@
+from typing import Any, Dict, Optional
+from fastapi import Request, Response
+import hashlib
+import orjson
+
+# Short lifetime for polled read endpoints; clients may reuse stale data while revalidating
+CACHE_CONTROL = "private, max-age=5, stale-while-revalidate=10"
+
+def body_version(body: Any) -> str:
+    """ETag version for a JSON body, so responses that differ never share a tag"""
+    return hashlib.blake2b(orjson.dumps(body, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
+
+class ConditionalGet:
+    """Dependency that adds ETag/Cache-Control to a read response and answers If-None-Match"""
+    def __init__(self, request: Request, response: Response):
+        self.request = request
+        self.response = response
+        # Validator headers, for handlers that build their own Response
+        self.headers: Dict[str, str] = {}
+
+    def check(self, version) -> Optional[Response]:
+        """Return a 304 response if the client already has this version, else tag the response"""
+        etag = f'W/"{version}"'
+        headers = self.headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+        if_none_match = self.request.headers.get("if-none-match")
+        if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+
+        self.response.headers.update(headers)
+        return None
@@ -1,6 +1,11 @@
+import hashlib
 import os
+import signal
 import subprocess
-from typing import Optional
+import threading
+from concurrent.futures import Future
+from typing import Dict, Optional
+from functools import lru_cache
 from app.config import settings
 import logging
 
@@ -28,15 +33,15 @@ server {{
 
     def __init__(self):
         self.conf_dir = settings.NGINX_CONF_DIR
+        # Reload requested by writes since the last one; every writer waits on it
+        self._pending: Optional[Future] = None
+        self._pending_lock = threading.Lock()
+        # Digest of the config last written per app, to skip no-op updates
+        self._written: Dict[int, bytes] = {}
 
-    def update_config(self, app_id: int, container) -> None:
+    def update_config(self, app_id: int, container_ip: str, container_port: int = 8000) -> None:
         """Update Nginx configuration for an application"""
         try:
-            # Get container network info
-            container_info = container.inspect()
-            container_ip = list(container_info["NetworkSettings"]["Networks"].values())[0]["IPAddress"]
-            container_port = 8000  # Assuming FastAPI apps run on port 8000
-
             # Generate config from template
             config = self.TEMPLATE.format(
                 app_id=app_id,
@@ -45,19 +50,59 @@ server {{
                 domain=f"app-{app_id}.quark.local"  # Example domain pattern
             )
 
-            # Write config file
+            # Unchanged config (e.g. a restarted container kept its IP): nothing to reload
+            digest = hashlib.blake2s(config.encode()).digest()
             config_path = os.path.join(self.conf_dir, f"app_{app_id}.conf")
+            if app_id not in self._written:
+                self._written[app_id] = self._digest_on_disk(config_path)
+            if self._written[app_id] == digest:
+                return
+
+            # Write config file
             with open(config_path, "w") as f:
                 f.write(config)
 
-            # Test and reload Nginx
-            self._test_config()
-            self._reload_nginx()
+            # Test and reload Nginx, together with any other updates in the window;
+            # forget the digest first so a failed reload is retried next time
+            self._written[app_id] = None
+            self._request_reload().result()
+            self._written[app_id] = digest
 
         except Exception as e:
             logger.error(f"Failed to update Nginx config: {str(e)}")
             raise
 
+    @staticmethod
+    def _digest_on_disk(config_path: str) -> Optional[bytes]:
+        """Digest of a config written before this process started, if any"""
+        try:
+            with open(config_path, "rb") as f:
+                return hashlib.blake2s(f.read()).digest()
+        except OSError:
+            return None
+
+    def _request_reload(self) -> Future:
+        """Join the pending reload, scheduling one if none is waiting"""
+        with self._pending_lock:
+            if self._pending is None:
+                self._pending = Future()
+                timer = threading.Timer(settings.NGINX_RELOAD_DELAY_SECONDS, self._apply_reload)
+                timer.daemon = True
+                timer.start()
+            return self._pending
+
+    def _apply_reload(self) -> None:
+        """Test and reload once for every config written during the delay"""
+        with self._pending_lock:
+            future, self._pending = self._pending, None
+        try:
+            self._test_config()
+            self._reload_nginx()
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(None)
+
     def _test_config(self) -> None:
         """Test Nginx configuration"""
         result = subprocess.run(["nginx", "-t"], capture_output=True, text=True)
@@ -66,6 +111,19 @@ server {{
 
     def _reload_nginx(self) -> None:
         """Reload Nginx configuration"""
+        # Signal the master directly when its pid is known, skipping a second exec
+        try:
+            with open(settings.NGINX_PID_FILE) as f:
+                os.kill(int(f.read().strip()), signal.SIGHUP)
+            return
+        except (OSError, ValueError) as e:
+            logger.debug("Signalling Nginx failed, falling back to nginx -s reload: %s", e)
+        
         result = subprocess.run(["nginx", "-s", "reload"], capture_output=True, text=True)
         if result.returncode != 0:
-            raise Exception(f"Failed to reload Nginx: {result.stderr}") 
\ No newline at end of file
+            raise Exception(f"Failed to reload Nginx: {result.stderr}")
+
+@lru_cache()
+def get_nginx_manager() -> NginxManager:
+    """Return the process-wide Nginx manager"""
+    return NginxManager()
@@ -7,4 +7,4 @@ nginx
 huey_consumer.py app.tasks.deployment.huey &
 
 # Start FastAPI application with uvicorn
-uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload 
\ No newline at end of file
+uvicorn app.main:app --host 0.0.0.0 --port 8000 --ws-ping-interval 20 --ws-ping-timeout 20 --reload 
\ No newline at end of file
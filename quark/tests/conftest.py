@@ -0,0 +1,102 @@
+import asyncio
+import importlib
+import os
+
+import httpx
+import pytest
+import pytest_asyncio
+from functools import lru_cache
+from types import MappingProxyType
+from argon2 import PasswordHasher
+from fastapi import Depends
+from fastapi.security import OAuth2PasswordBearer
+from fastapi.testclient import TestClient
+from app.models.user import User
+
+# Set before app is imported, so the engine and startup's create_all use a
+# throwaway database instead of writing ./quark.db; CI's DATABASE_URL wins.
+# The app itself is imported by the fixtures that need it, so collecting or
+# deselecting tests doesn't build the router tree, engine and middleware
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+@pytest.fixture(autouse=True, scope="session")
+def fast_password_hashing():
+    # Production argon2 parameters cost tens of milliseconds per hash; the
+    # tests only need hashes that round-trip
+    from app.utils import auth
+    original = auth.password_hasher
+    auth.password_hasher = PasswordHasher(time_cost=1, memory_cost=8, parallelism=1)
+    yield
+    auth.password_hasher = original
+
+def pytest_configure(config):
+    # A pytest-xdist worker will run tests, so it loads the app up front,
+    # before collection, instead of inside whichever test first needs it;
+    # plain runs keep the import lazy for --collect-only and -k
+    if hasattr(config, "workerinput"):
+        importlib.import_module("app.main")
+
+_real_sleep = asyncio.sleep
+
+async def _yield_only(delay, result=None):
+    # Still yields to the loop, so polling loops can't spin without letting
+    # anything else run
+    return await _real_sleep(0, result)
+
+@pytest.fixture(autouse=True)
+def no_sleep(request, monkeypatch):
+    """Skip the wall-clock waits in polling loops; mark a test real_sleep to keep them"""
+    if "real_sleep" not in request.keywords:
+        monkeypatch.setattr(asyncio, "sleep", _yield_only)
+
+@pytest.fixture(scope="session")
+def app():
+    from app.main import app
+    return app
+
+@pytest.fixture(scope="session")
+def client(app):
+    # Entered once so startup/shutdown run once for the whole session;
+    # modules needing a fresh database per test override this fixture
+    with TestClient(app) as c:
+        yield c
+
+@pytest_asyncio.fixture
+async def aclient(app):
+    # Calls the app directly on the test's event loop, without TestClient's
+    # portal thread; no startup/shutdown, so use it for plain HTTP tests
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as c:
+        yield c
+
+# Same scheme as app.utils.auth's, without importing it at collection time
+_bearer = OAuth2PasswordBearer(tokenUrl="auth/login")
+
+async def _test_user(token: str = Depends(_bearer)) -> User:
+    # Still requires a bearer token, so unauthenticated requests get a 401
+    return User(id=1, username="testuser", email="test@example.com", password="")
+
+@pytest.fixture(scope="module")
+def authenticated_user(app):
+    """Accept any bearer token as the test user, skipping JWT checks and the user lookup"""
+    from app.utils.auth import get_current_user
+    app.dependency_overrides[get_current_user] = _test_user
+    yield
+    del app.dependency_overrides[get_current_user]
+
+@lru_cache(maxsize=128)
+def _cached_token(sub: str, user_id: int) -> str:
+    """Access token for the claims, signed once per session"""
+    from app.utils import auth
+    return auth.create_access_token({"sub": sub, "id": user_id})
+
+@pytest.fixture(scope="session")
+def make_token():
+    return _cached_token
+
+@pytest.fixture(scope="session")
+def auth_headers():
+    # Tests only read the headers
+    token = _cached_token("test@example.com", 1)
+    return MappingProxyType({"Authorization": f"Bearer {token}"})
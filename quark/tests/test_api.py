@@ -1,39 +1,55 @@
+import asyncio
 import pytest
 from fastapi.testclient import TestClient
-from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.pool import StaticPool
 import jwt
 from datetime import datetime, timedelta
-from app.main import app
 from app.config import settings
 from app.models.user import User
 from app.models.application import Application
-from app.database import get_session
+from app.models.deployment import Deployment
+from sqlalchemy import inspect as sa_inspect
 
 # Create test database
-SQLALCHEMY_DATABASE_URL = "sqlite://"
-engine = create_engine(
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite://"
+engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
 
-def get_test_session():
-    with Session(engine) as session:
+async def get_test_session():
+    async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
 
-app.dependency_overrides[get_session] = get_test_session
+async def _run_metadata(method):
+    async with engine.begin() as conn:
+        await conn.run_sync(method)
+
+async def _add_all(*objects):
+    async with AsyncSession(engine) as session:
+        session.add_all(objects)
+        await session.commit()
 
 @pytest.fixture
-def client():
-    SQLModel.metadata.create_all(engine)
+def client(app, monkeypatch):
+    from app.database import get_async_session
+    from app.utils.auth import clear_auth_caches
+    
+    monkeypatch.setitem(app.dependency_overrides, get_async_session, get_test_session)
+    asyncio.run(_run_metadata(SQLModel.metadata.create_all))
     with TestClient(app) as c:
         yield c
-    SQLModel.metadata.drop_all(engine)
+    asyncio.run(_run_metadata(SQLModel.metadata.drop_all))
+    clear_auth_caches()
 
 @pytest.fixture
 def test_user():
     return {
+        "username": "testuser",
         "email": "test@example.com",
         "password": "testpassword123"
     }
@@ -56,12 +72,43 @@ def test_health_check(client):
     assert response.status_code == 200
     assert response.json() == {"status": "healthy"}
 
+def test_db_health_check(client):
+    response = client.get("/health/db")
+    assert response.status_code == 200
+    assert "status" in response.json()
+
+def test_prometheus_metrics_include_pool(client, auth_headers):
+    response = client.get("/metrics/prometheus", headers=auth_headers)
+    assert response.status_code == 200
+    assert "db_pool_checked_out" in response.text
+
+def test_request_metrics_use_route_template(client, auth_headers):
+    client.get("/apps/987654", headers=auth_headers)
+    response = client.get("/metrics/prometheus", headers=auth_headers)
+    assert 'endpoint="/apps/{app_id}"' in response.text
+    assert 'status_class="4xx"' in response.text
+    assert "987654" not in response.text
+
 def test_register_user(client, test_user):
     response = client.post("/auth/register", json=test_user)
     assert response.status_code == 200
     data = response.json()
     assert data["email"] == test_user["email"]
 
+def test_register_duplicate_user(client, test_user):
+    client.post("/auth/register", json=test_user)
+    
+    response = client.post("/auth/register", json=test_user)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+    
+    response = client.post(
+        "/auth/register",
+        json={**test_user, "email": "other@example.com"}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Username already taken"
+
 def test_login_user(client, test_user):
     # Register first
     client.post("/auth/register", json=test_user)
@@ -73,9 +120,44 @@ def test_login_user(client, test_user):
     assert "access_token" in data
     assert data["token_type"] == "bearer"
 
+def test_login_wrong_password(client, test_user):
+    client.post("/auth/register", json=test_user)
+    
+    response = client.post(
+        "/auth/login",
+        data={"username": test_user["username"], "password": "wrong-password"}
+    )
+    assert response.status_code == 401
+
+def test_login_unknown_user(client):
+    response = client.post(
+        "/auth/login",
+        data={"username": "nobody", "password": "testpassword123"}
+    )
+    assert response.status_code == 401
+
+def test_logout_revokes_token(client, auth_headers):
+    assert client.get("/auth/me", headers=auth_headers).status_code == 200
+    
+    response = client.post("/auth/logout", headers=auth_headers)
+    assert response.status_code == 200
+    
+    response = client.get("/auth/me", headers=auth_headers)
+    assert response.status_code == 401
+
+def test_cached_user_is_a_copy(client, auth_headers):
+    from app.utils import auth
+    
+    assert client.get("/auth/me", headers=auth_headers).status_code == 200
+    
+    # The cache holds a copy never added to any session, not the loaded row
+    assert sa_inspect(auth._user_cache["test@example.com"]).transient
+    response = client.get("/auth/me", headers=auth_headers)
+    assert response.json()["email"] == "test@example.com"
+
 def test_create_application(client, auth_headers):
     app_data = {
-        "name": "Test App",
+        "name": "test-app",
         "repo_url": "https://github.com/test/app",
         "branch": "main",
         "cpu_limit": 20.0,
@@ -95,8 +177,227 @@ def test_create_application(client, auth_headers):
 def test_list_applications(client, auth_headers):
     response = client.get("/apps/", headers=auth_headers)
     assert response.status_code == 200
-    assert isinstance(response.json(), list)
+    data = response.json()
+    assert isinstance(data["items"], list)
+    assert data["next_cursor"] is None
+
+def test_list_applications_cursor_pagination(client, auth_headers):
+    for i in range(3):
+        client.post(
+            "/apps/",
+            json={"name": f"app-{i}", "repo_url": "https://github.com/test/app"},
+            headers=auth_headers
+        )
+    
+    response = client.get("/apps/?limit=2", headers=auth_headers)
+    first_page = response.json()
+    assert [app["name"] for app in first_page["items"]] == ["app-2", "app-1"]
+    assert first_page["next_cursor"]
+    
+    response = client.get(
+        f"/apps/?limit=2&cursor={first_page['next_cursor']}",
+        headers=auth_headers
+    )
+    second_page = response.json()
+    assert [app["name"] for app in second_page["items"]] == ["app-0"]
+    assert second_page["next_cursor"] is None
+
+def test_list_applications_invalid_cursor(client, auth_headers):
+    response = client.get("/apps/?cursor=not-a-cursor", headers=auth_headers)
+    assert response.status_code == 400
+
+def test_list_applications_status_filter(client, auth_headers):
+    client.post(
+        "/apps/",
+        json={"name": "test-app", "repo_url": "https://github.com/test/app"},
+        headers=auth_headers
+    )
+    response = client.get("/apps/?status=created", headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 1
+    
+    response = client.get("/apps/?status=running", headers=auth_headers)
+    assert response.json()["items"] == []
+    
+    response = client.get("/apps/?status=runing", headers=auth_headers)
+    assert response.status_code == 422
 
 def test_unauthorized_access(client):
     response = client.get("/apps/")
-    assert response.status_code == 401 
\ No newline at end of file
+    assert response.status_code == 401 
+
+def test_get_application(client, auth_headers):
+    response = client.post(
+        "/apps/",
+        json={"name": "test-app", "repo_url": "https://github.com/test/app"},
+        headers=auth_headers
+    )
+    app_id = response.json()["id"]
+    
+    response = client.get(f"/apps/{app_id}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["name"] == "test-app"
+
+def test_get_application_other_owner(client, auth_headers):
+    response = client.post(
+        "/apps/",
+        json={"name": "test-app", "repo_url": "https://github.com/test/app"},
+        headers=auth_headers
+    )
+    app_id = response.json()["id"]
+    
+    other_user = {
+        "username": "otheruser",
+        "email": "other@example.com",
+        "password": "otherpassword123"
+    }
+    client.post("/auth/register", json=other_user)
+    response = client.post("/auth/login", data=other_user)
+    other_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    
+    response = client.get(f"/apps/{app_id}", headers=other_headers)
+    assert response.status_code == 404
+
+def test_delete_application(client, auth_headers):
+    response = client.post(
+        "/apps/",
+        json={"name": "test-app", "repo_url": "https://github.com/test/app"},
+        headers=auth_headers
+    )
+    app_id = response.json()["id"]
+    
+    response = client.delete(f"/apps/{app_id}", headers=auth_headers)
+    assert response.status_code == 200
+    
+    response = client.delete(f"/apps/{app_id}", headers=auth_headers)
+    assert response.status_code == 404
+
+def test_update_application(client, auth_headers):
+    response = client.post(
+        "/apps/",
+        json={"name": "test-app", "repo_url": "https://github.com/test/app"},
+        headers=auth_headers
+    )
+    app_id = response.json()["id"]
+    
+    response = client.put(
+        f"/apps/{app_id}",
+        json={"branch": "develop", "cpu_limit": 2.0},
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["branch"] == "develop"
+    assert data["cpu_limit"] == 2.0
+    assert data["name"] == "test-app"
+    
+    response = client.put("/apps/9999", json={"branch": "develop"}, headers=auth_headers)
+    assert response.status_code == 404
+
+def test_application_name_validation(client, auth_headers):
+    for name in ("My_App", "ab", "app name"):
+        response = client.post(
+            "/apps/",
+            json={"name": name, "repo_url": "https://github.com/test/app"},
+            headers=auth_headers
+        )
+        assert response.status_code == 422
+    
+    response = client.post(
+        "/apps/",
+        json={"name": "test-app-2", "repo_url": "https://github.com/test/app"},
+        headers=auth_headers
+    )
+    app_id = response.json()["id"]
+    response = client.put(f"/apps/{app_id}", json={"name": "Bad.Name"}, headers=auth_headers)
+    assert response.status_code == 422
+
+def test_get_deployment_not_found(client, auth_headers):
+    response = client.get("/deployments/9999", headers=auth_headers)
+    assert response.status_code == 404
+
+def test_list_application_deployments_empty(client, auth_headers):
+    response = client.get("/deployments/application/9999", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == []
+
+def test_list_application_deployments(client, auth_headers):
+    asyncio.run(_add_all(
+        Deployment(application_id=1, commit_sha="abc123"),
+        Deployment(application_id=1, commit_sha="def456")
+    ))
+    
+    response = client.get("/deployments/application/1", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert [d["commit_sha"] for d in data] == ["def456", "abc123"]
+    assert data[0]["status"] == "pending"
+    
+    response = client.get(f"/deployments/{data[0]['id']}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["commit_sha"] == "def456"
+
+def test_get_deployment_etag(client, auth_headers):
+    asyncio.run(_add_all(Deployment(id=1, application_id=1, commit_sha="abc123")))
+    
+    response = client.get("/deployments/1", headers=auth_headers)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert "max-age" in response.headers["cache-control"]
+    
+    response = client.get("/deployments/1", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+def test_github_webhook_ignores_non_push(client):
+    response = client.post(
+        "/github/webhook",
+        content=b"{}",
+        headers={"X-Hub-Signature-256": "sha256=", "X-GitHub-Event": "ping"}
+    )
+    assert response.status_code == 200
+    assert response.json()["status"] == "ignored"
+
+def test_github_webhook_signature(client, monkeypatch):
+    import hmac
+    from app.api import github
+    monkeypatch.setattr(github, "_WEBHOOK_MAC", hmac.new(b"secret", digestmod="sha256"))
+    body = b'{"ref": "refs/heads/main", "repository": {"clone_url": "https://github.com/x/y.git"}, "after": "abc"}'
+    
+    response = client.post(
+        "/github/webhook",
+        content=body,
+        headers={"X-Hub-Signature-256": "sha256=bad", "X-GitHub-Event": "push"}
+    )
+    assert response.status_code == 401
+    
+    signature = "sha256=" + hmac.new(b"secret", body, "sha256").hexdigest()
+    response = client.post(
+        "/github/webhook",
+        content=body,
+        headers={"X-Hub-Signature-256": signature, "X-GitHub-Event": "push"}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"status": "ignored", "reason": "no matching application"}
+
+def test_github_webhook_invalid_payload(client):
+    response = client.post(
+        "/github/webhook",
+        content=b'{"ref": "refs/heads/main"}',
+        headers={"X-Hub-Signature-256": "sha256=", "X-GitHub-Event": "push"}
+    )
+    assert response.status_code == 400
+
+def test_github_webhook_duplicate_delivery(client):
+    body = b'{"ref": "refs/heads/main", "repository": {"clone_url": "https://github.com/x/y.git"}, "after": "abc"}'
+    headers = {
+        "X-Hub-Signature-256": "sha256=",
+        "X-GitHub-Event": "push",
+        "X-GitHub-Delivery": "72d3162e-cc78-11e3-81ab-4c9367dc0958"
+    }
+    
+    response = client.post("/github/webhook", content=body, headers=headers)
+    assert response.json()["status"] == "ignored"
+    
+    response = client.post("/github/webhook", content=body, headers=headers)
+    assert response.json()["status"] == "duplicate"
@@ -0,0 +1,86 @@
+import time
+import docker
+import git
+import pytest
+from unittest.mock import MagicMock, patch
+from app.utils.docker import DockerManager
+
+FRAME = {
+    "cpu_stats": {"cpu_usage": {"total_usage": 200}, "system_cpu_usage": 1000},
+    "precpu_stats": {"cpu_usage": {"total_usage": 100}, "system_cpu_usage": 500},
+    "memory_stats": {"usage": 64 * 1024 * 1024},
+    "networks": {
+        "eth0": {"rx_bytes": 1000, "tx_bytes": 500},
+        "eth1": {"rx_bytes": 24, "tx_bytes": 12}
+    }
+}
+
+@pytest.fixture
+def manager():
+    with patch("app.utils.docker.docker.from_env"):
+        yield DockerManager()
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+def test_container_stats_come_from_stream(manager):
+    def stream(**kwargs):
+        # Like dockerd, keep sending a frame every tick until the reader stops
+        while True:
+            yield FRAME
+            time.sleep(0.01)
+    
+    container = MagicMock()
+    container.stats.side_effect = stream
+    manager.client.containers.get.return_value = container
+    
+    # The first lookup starts the reader and reports zero usage
+    assert manager.get_container_stats("abc") == {
+        "cpu_usage": 0, "memory_usage": 0, "network_rx": 0, "network_tx": 0
+    }
+    assert _wait_for(lambda: manager.get_container_stats("abc")["cpu_usage"] == 20.0)
+    stats = manager.get_container_stats("abc")
+    assert stats["memory_usage"] == 64.0
+    assert (stats["network_rx"], stats["network_tx"]) == (1024, 512)
+    container.stats.assert_called_once_with(stream=True, decode=True)
+    manager.unwatch_stats("abc")
+
+def test_stop_container_stops_stream(manager):
+    manager.client.containers.get.return_value = MagicMock()
+    manager.unwatch_stats("abc")
+    manager.watch_stats("abc")
+    manager.stop_container("abc")
+    assert "abc" not in manager._streams
+
+def test_stats_readers_are_capped(manager, monkeypatch):
+    monkeypatch.setattr("app.utils.docker.settings.DOCKER_MAX_STATS_STREAMS", 1)
+    
+    def gone(_):
+        # Keeps the reader alive for the test, then ends it quietly
+        time.sleep(0.1)
+        raise docker.errors.NotFound("gone")
+    
+    manager.client.containers.get.side_effect = gone
+    manager.watch_stats("abc")
+    manager.watch_stats("def")
+    assert list(manager._streams) == ["abc"]
+    manager.unwatch_stats("abc")
+
+def test_fetch_commit_is_shallow(tmp_path):
+    upstream = git.Repo.init(tmp_path / "upstream")
+    for name in ("a", "b"):
+        (tmp_path / "upstream" / name).write_text(name)
+        upstream.index.add([name])
+        upstream.index.commit(name)
+    sha = upstream.head.commit.hexsha
+    
+    repo = git.Repo.init(tmp_path / "clone")
+    ref = DockerManager._fetch_commit(repo, (tmp_path / "upstream").as_uri(), sha)
+    
+    # The single commit came without its parent, not via the full-history fallback
+    assert ref == "FETCH_HEAD"
+    assert repo.commit(ref).hexsha == sha
+    assert (tmp_path / "clone" / ".git" / "shallow").read_text().strip() == sha
@@ -0,0 +1,65 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.middleware.error_handler import ErrorHandlerMiddleware, generate_error_id
+from app.utils.errors import QuarkError
+from sqlalchemy.exc import OperationalError
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+    app.add_middleware(ErrorHandlerMiddleware)
+
+    @app.get("/ok")
+    async def ok_endpoint():
+        return {"message": "success"}
+
+    @app.get("/quark-error")
+    async def quark_error_endpoint():
+        raise QuarkError("Application missing", "NOT_FOUND", status_code=404)
+
+    @app.get("/db-error")
+    async def db_error_endpoint():
+        raise OperationalError("SELECT 1", {}, Exception('database "quark" is locked'))
+
+    @app.get("/unexpected")
+    async def unexpected_endpoint():
+        raise RuntimeError("boom")
+
+    return app
+
+@pytest.fixture
+def client(app):
+    return TestClient(app)
+
+def test_passes_through_responses(client):
+    response = client.get("/ok")
+    assert response.status_code == 200
+    assert response.json() == {"message": "success"}
+
+def test_quark_error(client):
+    response = client.get("/quark-error")
+    assert response.status_code == 404
+    assert response.json() == {"code": "NOT_FOUND", "message": "Application missing", "details": {}}
+
+def test_unexpected_error(client):
+    response = client.get("/unexpected")
+    assert response.status_code == 500
+    data = response.json()
+    assert data["code"] == "INTERNAL_SERVER_ERROR"
+    assert data["details"]["error"] == "boom"
+    assert data["error_id"]
+
+def test_database_error(client):
+    response = client.get("/db-error")
+    assert response.status_code == 500
+    data = response.json()
+    assert data["code"] == "DATABASE_ERROR"
+    assert data["message"] == "Database operation failed"
+    assert '"quark" is locked' in data["details"]["error"]
+    assert data["error_id"]
+
+def test_error_ids_are_unique_hex():
+    ids = {generate_error_id() for _ in range(500)}
+    assert len(ids) == 500
+    assert all(len(error_id) == 32 and int(error_id, 16) >= 0 for error_id in ids)
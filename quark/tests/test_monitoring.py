@@ -1,33 +1,54 @@
 import pytest
+import pytest_asyncio
 from unittest.mock import Mock, patch
+from app.services import monitoring
 from app.services.monitoring import MonitoringService
+from app.models.user import User
 from app.models.application import Application
 from app.models.deployment import Deployment
-from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.pool import StaticPool
 
-# Create test database
-SQLALCHEMY_DATABASE_URL = "sqlite://"
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
+# Every test in this module shares one event loop, so the in-memory
+# database and its schema are created once
+pytestmark = pytest.mark.asyncio(loop_scope="module")
 
-@pytest.fixture
-def db_session():
-    SQLModel.metadata.create_all(engine)
-    with Session(engine) as session:
-        yield session
-    SQLModel.metadata.drop_all(engine)
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite://"
 
-@pytest.fixture
-def monitoring_service(db_session):
-    return MonitoringService(db_session)
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def engine():
+    engine = create_async_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+@pytest_asyncio.fixture(loop_scope="module")
+async def db_session(engine):
+    # Each test runs in a transaction that is rolled back instead of
+    # dropping and recreating the schema; commits become savepoints
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        async with AsyncSession(
+            bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False
+        ) as session:
+            yield session
+        await transaction.rollback()
+
+@pytest.fixture(autouse=True)
+def clear_metrics_caches():
+    monitoring._metrics_cache.values.clear()
+    monitoring._container_ids.clear()
 
 @pytest.fixture
 def mock_docker():
-    with patch('app.services.monitoring.DockerManager') as mock:
+    with patch('app.services.monitoring.get_docker_manager') as mock:
         docker_instance = Mock()
         docker_instance.get_container_stats.return_value = {
             "cpu_usage": 25.5,
@@ -38,20 +59,24 @@ def mock_docker():
         mock.return_value = docker_instance
         yield mock
 
-def test_get_app_metrics_success(db_session, monitoring_service, mock_docker):
+@pytest.fixture
+def monitoring_service(db_session, mock_docker):
+    return MonitoringService(db_session)
+
+async def test_get_app_metrics_success(db_session, monitoring_service, mock_docker):
     # Create test data
     app = Application(name="Test App", repo_url="test/repo", cpu_limit=50.0, memory_limit=1024, owner_id=1)
     db_session.add(app)
-    db_session.commit()
+    await db_session.commit()
 
     deployment = Deployment(
         application_id=app.id,
         container_id="test_container",
         status="successful",
-        version="1.0.0"
+        commit_sha="abc123"
     )
     db_session.add(deployment)
-    db_session.commit()
+    await db_session.commit()
 
     # Test metrics collection
     metrics = await monitoring_service.get_app_metrics(app.id)
@@ -63,24 +88,33 @@ def test_get_app_metrics_success(db_session, monitoring_service, mock_docker):
     assert metrics["network_tx"] == 2048
     assert "timestamp" in metrics
 
-def test_get_app_metrics_no_app(monitoring_service):
+async def test_get_app_metrics_no_app(monitoring_service):
     metrics = await monitoring_service.get_app_metrics(999)
     assert "error" in metrics
     assert metrics["error"] == "Application not found"
 
-def test_get_app_metrics_no_deployment(db_session, monitoring_service):
+async def test_get_app_metrics_no_deployment(db_session, monitoring_service):
     # Create app without deployment
     app = Application(name="Test App", repo_url="test/repo", cpu_limit=50.0, memory_limit=1024, owner_id=1)
     db_session.add(app)
-    db_session.commit()
+    await db_session.commit()
 
     metrics = await monitoring_service.get_app_metrics(app.id)
     assert "error" in metrics
     assert metrics["error"] == "No active deployment found"
 
-def test_get_system_metrics(monitoring_service):
+async def test_get_system_metrics(monitoring_service):
     metrics = await monitoring_service.get_system_metrics()
     assert "cpu_percent" in metrics
     assert "memory_percent" in metrics
     assert "disk_percent" in metrics
-    assert "timestamp" in metrics 
\ No newline at end of file
+    assert "timestamp" in metrics
+
+async def test_single_flight_locks_are_released():
+    cache = monitoring._SingleFlightCache(ttl=1.0)
+
+    async def produce():
+        return {"value": 1}
+
+    assert await cache.get("a", produce) == {"value": 1}
+    assert len(cache.locks) == 0
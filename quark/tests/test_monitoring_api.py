@@ -1,60 +1,65 @@
 import pytest
-from fastapi.testclient import TestClient
-from unittest.mock import patch
-from app.main import app
-from app.utils.auth import create_jwt_token
-
-@pytest.fixture
-def client():
-    return TestClient(app)
-
-@pytest.fixture
-def auth_headers():
-    token = create_jwt_token({"sub": "test@example.com", "id": 1})
-    return {"Authorization": f"Bearer {token}"}
-
-def test_get_system_metrics(client, auth_headers):
-    with patch('app.services.monitoring.MonitoringService.get_system_metrics') as mock:
-        mock.return_value = {
-            "cpu_percent": 25.5,
-            "memory_percent": 60.0,
-            "disk_percent": 45.0,
-            "timestamp": 1234567890
-        }
-        
-        response = client.get("/metrics/system", headers=auth_headers)
-        assert response.status_code == 200
-        data = response.json()
-        assert "cpu_percent" in data
-        assert "memory_percent" in data
-        assert "disk_percent" in data
-
-def test_get_app_metrics(client, auth_headers):
-    with patch('app.services.monitoring.MonitoringService.get_app_metrics') as mock:
-        mock.return_value = {
-            "cpu_usage": 25.5,
-            "memory_usage": 512,
-            "network_rx": 1024,
-            "network_tx": 2048,
-            "timestamp": 1234567890
-        }
-        
-        response = client.get("/metrics/apps/1", headers=auth_headers)
-        assert response.status_code == 200
-        data = response.json()
-        assert "cpu_usage" in data
-        assert "memory_usage" in data
-        assert "network_rx" in data
-        assert "network_tx" in data
-
-def test_get_app_metrics_not_found(client, auth_headers):
-    with patch('app.services.monitoring.MonitoringService.get_app_metrics') as mock:
-        mock.return_value = {"error": "Application not found"}
-        
-        response = client.get("/metrics/apps/999", headers=auth_headers)
-        assert response.status_code == 404
-        assert response.json()["detail"] == "Application not found"
-
-def test_unauthorized_access(client):
-    response = client.get("/metrics/system")
+from types import MappingProxyType, SimpleNamespace
+from unittest.mock import DEFAULT, AsyncMock, patch
+
+# These tests cover the metrics endpoints, not authentication
+pytestmark = pytest.mark.usefixtures("authenticated_user")
+
+# Read-only so a handler can't alter the canned data other tests see
+SYSTEM_METRICS = MappingProxyType({
+    "cpu_percent": 25.5,
+    "memory_percent": 60.0,
+    "disk_percent": 45.0,
+    "timestamp": 1234567890
+})
+
+APP_METRICS = MappingProxyType({
+    "cpu_usage": 25.5,
+    "memory_usage": 512,
+    "network_rx": 1024,
+    "network_tx": 2048,
+    "timestamp": 1234567890
+})
+
+APP_NOT_FOUND = MappingProxyType({"error": "Application not found"})
+
+@pytest.fixture(scope="module")
+def monitoring_mock():
+    # Both methods patched in one go for the module; tests set the return values they need.
+    # The Docker manager is stubbed too, since MonitoringService() asks for one
+    with patch('app.services.monitoring.get_docker_manager'), patch.multiple(
+        'app.services.monitoring.MonitoringService',
+        get_system_metrics=DEFAULT,
+        get_app_metrics=DEFAULT,
+        new_callable=AsyncMock
+    ) as mocks:
+        yield SimpleNamespace(**mocks)
+
+@pytest.mark.parametrize("path, method, metrics, status_code, expected", [
+    ("/metrics/system", "get_system_metrics", SYSTEM_METRICS, 200, SYSTEM_METRICS),
+    ("/metrics/apps/1", "get_app_metrics", APP_METRICS, 200, APP_METRICS),
+    ("/metrics/apps/999", "get_app_metrics", APP_NOT_FOUND, 404, {"detail": "Application not found"}),
+])
+async def test_get_metrics(aclient, auth_headers, monitoring_mock, path, method, metrics, status_code, expected):
+    getattr(monitoring_mock, method).return_value = metrics
+    
+    response = await aclient.get(path, headers=auth_headers)
+    assert response.status_code == status_code
+    # The body may carry more (e.g. db_pool), but includes everything expected
+    assert response.json().items() >= expected.items()
+
+async def test_system_metrics_etag_covers_pool(aclient, auth_headers, monitoring_mock, monkeypatch):
+    monitoring_mock.get_system_metrics.return_value = SYSTEM_METRICS
+    monkeypatch.setattr("app.api.monitoring.get_pool_status", lambda: {"status": "idle"})
+    
+    etag = (await aclient.get("/metrics/system", headers=auth_headers)).headers["etag"]
+    conditional = {**auth_headers, "If-None-Match": etag}
+    assert (await aclient.get("/metrics/system", headers=conditional)).status_code == 304
+    
+    # Same metrics timestamp, different pool usage: a new body, so no 304
+    monkeypatch.setattr("app.api.monitoring.get_pool_status", lambda: {"status": "busy"})
+    assert (await aclient.get("/metrics/system", headers=conditional)).status_code == 200
+
+async def test_unauthorized_access(aclient):
+    response = await aclient.get("/metrics/system")
     assert response.status_code == 401 
\ No newline at end of file
@@ -1,23 +1,31 @@
+import time
 import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from app.middleware.security import SecurityMiddleware
-from unittest.mock import patch
-
-@pytest.fixture
-def app():
-    app = FastAPI()
-    app.add_middleware(SecurityMiddleware)
-    
-    @app.get("/test")
-    async def test_endpoint():
-        return {"message": "success"}
-    
-    return app
-
-@pytest.fixture
-def client(app):
-    return TestClient(app)
+
+# Built once at import; the middleware's buckets persist across the module's tests
+_app = FastAPI()
+_app.add_middleware(SecurityMiddleware)
+
+@_app.get("/test")
+async def _test_endpoint():
+    return {"message": "success"}
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(_app) as c:
+        yield c
+
+@pytest.fixture(scope="module")
+def security(client):
+    """The app's SecurityMiddleware instance, whose buckets tests can set directly"""
+    # Starlette builds the middleware stack on the first request
+    client.get("/test")
+    layer = _app.middleware_stack
+    while not isinstance(layer, SecurityMiddleware):
+        layer = layer.app
+    return layer
 
 def test_security_headers(client):
     response = client.get("/test")
@@ -27,13 +35,19 @@ def test_security_headers(client):
     assert response.headers["X-XSS-Protection"] == "1; mode=block"
     assert response.headers["Strict-Transport-Security"] == "max-age=31536000; includeSubDomains"
 
-def test_rate_limiting(client):
+def test_rate_limiting(client, security, monkeypatch):
     # Test normal request
     response = client.get("/test")
     assert response.status_code == 200
 
-    # Simulate rate limiting
-    with patch('app.middleware.security.SecurityMiddleware._check_rate_limit', return_value=False):
-        response = client.get("/test")
-        assert response.status_code == 429
-        assert response.json()["detail"] == "Too many requests" 
\ No newline at end of file
+    # Overdraw the test client's bucket so far that no refill during the test matters
+    monkeypatch.setitem(security.buckets, "testclient", (-1e9, time.monotonic()))
+    response = client.get("/test")
+    assert response.status_code == 429
+    assert response.json()["detail"] == "Too many requests"
+
+def test_token_bucket_exhaustion(client, monkeypatch):
+    monkeypatch.setattr("app.middleware.security._BURST", 3.0)
+    monkeypatch.setattr("app.middleware.security._RATE", 0.0)
+    statuses = [client.get("/test").status_code for _ in range(4)]
+    assert statuses == [200, 200, 200, 429]
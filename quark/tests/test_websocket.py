@@ -1,55 +1,107 @@
+import asyncio
+import orjson
 import pytest
-from fastapi.testclient import TestClient
-from fastapi.websockets import WebSocket
-from unittest.mock import patch, Mock
-from app.main import app
-from app.api.ws import manager
+from app.models.application import Application
+from app.models.user import User
 
-@pytest.fixture
-def websocket_client():
-    return TestClient(app)
+# ws.manager is a process-wide singleton, so under pytest-xdist's loadgroup mode these tests stay on one worker
+pytestmark = pytest.mark.xdist_group("ws")
+
+# A plain dict: the producer serializes it with orjson, which rejects mappingproxy
+APP_METRICS = {
+    "cpu_usage": 25.5,
+    "memory_usage": 512,
+    "network_rx": 1024,
+    "network_tx": 2048,
+    "timestamp": 1234567890
+}
+# What the producer sends for APP_METRICS, so frames are compared without parsing
+METRICS_MESSAGE = orjson.dumps({"type": "metrics", "data": APP_METRICS}).decode()
+
+class _StubMonitoringService:
+    """Canned metrics for the producer, without Mock's per-call bookkeeping"""
+    db = None
+
+    async def get_app_metrics(self, app_id: int) -> dict:
+        return APP_METRICS
+
+@pytest.fixture(scope="module")
+def monitoring_stub():
+    # No calls are recorded, so nothing needs resetting between tests
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("app.api.ws.MonitoringService", _StubMonitoringService)
+        yield
 
 @pytest.fixture
-def mock_monitoring_service():
-    with patch('app.api.ws.MonitoringService') as mock:
-        service_instance = Mock()
-        service_instance.get_app_metrics.return_value = {
-            "cpu_usage": 25.5,
-            "memory_usage": 512,
-            "network_rx": 1024,
-            "network_tx": 2048,
-            "timestamp": 1234567890
-        }
-        mock.return_value = service_instance
-        yield mock
-
-def test_websocket_connection(websocket_client, mock_monitoring_service):
-    with websocket_client.websocket_connect("/ws/metrics/1") as websocket:
-        data = websocket.receive_json()
-        assert "cpu_usage" in data
-        assert "memory_usage" in data
-        assert "network_rx" in data
-        assert "network_tx" in data
-
-@pytest.mark.asyncio
-async def test_connection_manager():
-    websocket = Mock(spec=WebSocket)
-    user_id = 1
+def ws_manager():
+    from app.api.ws import manager
+    return manager
+
+async def _create_owned_app() -> int:
+    from app.database import async_session_maker
+    async with async_session_maker() as db:
+        owner = User(username="wsowner", email="ws-owner@example.com", password="")
+        db.add(owner)
+        await db.commit()
+        application = Application(
+            name="ws-app", repo_url="https://github.com/test/ws-app",
+            cpu_limit=1.0, memory_limit=512, owner_id=owner.id
+        )
+        db.add(application)
+        await db.commit()
+        return application.id
+
+@pytest.fixture(scope="module")
+def app_id(client):
+    # Created on the client's event loop, which owns the engine's connections
+    return client.portal.call(_create_owned_app)
+
+async def run_ws(app, path: str, query_string: bytes, frames: int = 1) -> list:
+    """Drive a WebSocket route through the ASGI callable on the test's own loop,
+    with no TestClient portal thread; the client hangs up after `frames` frames"""
+    scope = {
+        "type": "websocket", "path": path, "raw_path": path.encode(),
+        "root_path": "", "scheme": "ws", "query_string": query_string,
+        "headers": [], "subprotocols": [],
+        "client": ("testclient", 50000), "server": ("testserver", 80),
+    }
+    sent = []
+    enough = asyncio.Event()
+    handshake = [{"type": "websocket.connect"}]
+    
+    async def receive():
+        if handshake:
+            return handshake.pop()
+        await enough.wait()
+        return {"type": "websocket.disconnect", "code": 1000}
+    
+    async def send(message):
+        sent.append(message)
+        if sum(m["type"] == "websocket.send" for m in sent) >= frames:
+            enough.set()
     
-    await manager.connect(websocket, user_id)
-    assert user_id in manager.active_connections
-    assert websocket in manager.active_connections[user_id]
+    await asyncio.wait_for(app(scope, receive, send), timeout=5)
+    return sent
+
+async def test_websocket_connection(app, app_id, monitoring_stub, make_token):
+    query = f"token={make_token('ws-owner@example.com', 0)}".encode()
+    sent = await run_ws(app, f"/ws/metrics/{app_id}", query, frames=2)
     
-    await manager.disconnect(websocket, user_id)
-    assert user_id not in manager.active_connections
-
-@pytest.mark.asyncio
-async def test_send_personal_message():
-    websocket = Mock(spec=WebSocket)
-    user_id = 1
-    message = {"type": "test", "data": "test_message"}
+    assert sent[0]["type"] == "websocket.accept"
+    # Updates keep arriving without the client sending anything; one more may
+    # go out before the handler sees the hang-up
+    assert [m["text"] for m in sent[1:3]] == [METRICS_MESSAGE, METRICS_MESSAGE]
+
+async def test_websocket_rejects_other_users(app, app_id, make_token):
+    query = f"token={make_token('test@example.com', 1)}".encode()
+    sent = await run_ws(app, f"/ws/metrics/{app_id}", query)
     
-    await manager.connect(websocket, user_id)
-    await manager.send_personal_message(message, user_id)
+    assert [(m["type"], m["code"]) for m in sent] == [("websocket.close", 1008)]
+
+async def test_producer_stops_with_last_subscriber(ws_manager, monitoring_stub):
+    queue = ws_manager.subscribe(42)
+    assert 42 in ws_manager.producers
     
-    websocket.send_json.assert_called_once_with(message) 
\ No newline at end of file
+    ws_manager.unsubscribe(42, queue)
+    assert 42 not in ws_manager.topics
+    assert 42 not in ws_manager.producers